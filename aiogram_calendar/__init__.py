@@ -1,6 +1,54 @@
 # flake8: noqa
-from aiogram_calendar.common import get_user_locale
-from aiogram_calendar.simple_calendar import SimpleCalendar
-from aiogram_calendar.dialog_calendar import DialogCalendar
-from aiogram_calendar.multiple_calendar import MultipleCalendar
-from aiogram_calendar.schemas import SimpleCalendarCallback, DialogCalendarCallback, CalendarLabels
+# Calendars, schemas and aiogram are imported on first access of their names, so importing package is cheap
+# and e.g. using only DateIntervalSet does not load aiogram and pydantic at all
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from aiogram_calendar.common import get_user_locale, resolve_locale
+    from aiogram_calendar.simple_calendar import SimpleCalendar
+    from aiogram_calendar.dialog_calendar import DialogCalendar
+    from aiogram_calendar.multiple_calendar import MultipleCalendar
+    from aiogram_calendar.datetime_calendar import DateTimeCalendar
+    from aiogram_calendar.schemas import SimpleCalendarCallback, DialogCalendarCallback, DateTimeCalendarCallback, \
+        CalendarLabels
+    from aiogram_calendar.selection import DateIntervalSet, RecurrenceRule, iter_weekday_dates
+    from aiogram_calendar.session import SelectionSession, SelectionSessions
+    from aiogram_calendar.router import create_calendar_router
+    from aiogram_calendar.broadcast import BroadcastRecipient, broadcast_calendar
+
+_LAZY_NAMES = {
+    "get_user_locale": "common",
+    "resolve_locale": "common",
+    "SimpleCalendar": "simple_calendar",
+    "DialogCalendar": "dialog_calendar",
+    "MultipleCalendar": "multiple_calendar",
+    "DateTimeCalendar": "datetime_calendar",
+    "SimpleCalendarCallback": "schemas",
+    "DialogCalendarCallback": "schemas",
+    "DateTimeCalendarCallback": "schemas",
+    "CalendarLabels": "schemas",
+    "DateIntervalSet": "selection",
+    "RecurrenceRule": "selection",
+    "iter_weekday_dates": "selection",
+    "SelectionSession": "session",
+    "SelectionSessions": "session",
+    "create_calendar_router": "router",
+    "BroadcastRecipient": "broadcast",
+    "broadcast_calendar": "broadcast",
+}
+
+__all__ = list(_LAZY_NAMES)
+
+
+def __getattr__(name: str):
+    module_name = _LAZY_NAMES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+    value = getattr(import_module(f"{__name__}.{module_name}"), name)
+    globals()[name] = value  # next access does not go through __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_NAMES))
@@ -0,0 +1,127 @@
+"""Sending calendar to many chats at once, e.g. asking all customers to pick a delivery date
+
+    report = await broadcast_calendar(bot, chat_ids, "Pick your delivery date", rate=25)
+    for chat_id, error in report.failures.items():
+        ...
+"""
+import asyncio
+from datetime import datetime
+from typing import Iterable, NamedTuple, Union
+
+from aiogram.exceptions import TelegramRetryAfter
+
+from .simple_calendar import SimpleCalendar
+
+
+class BroadcastRecipient(NamedTuple):
+    chat_id: Union[int, str]
+    locale: str = None  # language of calendar, default English labels if None
+    year: int = None  # year and month calendar starts with, the current ones if None
+    month: int = None
+    min_date: datetime = None  # range of dates allowed to select
+    max_date: datetime = None
+
+    @property
+    def render_key(self) -> tuple:
+        "Recipients with the same key get the same keyboard"
+        return self.locale, self.year, self.month, self.min_date, self.max_date
+
+
+class BroadcastReport(NamedTuple):
+    sent: int
+    failures: dict  # chat id -> exception of its failed send
+    renders: int  # distinct keyboards rendered
+
+
+class RateLimiter:
+    """Spaces acquisitions evenly, at most rate per second, e.g. Bot API allows about 30 messages per second.
+    Flood control of Bot API applies to the whole bot, so pause stops all acquisitions, not only the failed one
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate
+        self._next = 0.0
+        self._paused_until = 0.0
+
+    def pause(self, seconds: float):
+        "Lets no acquisition through for seconds, acquisitions waiting for earlier slots take new ones"
+        self._paused_until = max(self._paused_until, asyncio.get_running_loop().time() + seconds)
+        self._next = max(self._next, self._paused_until)
+
+    async def acquire(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            slot = max(now, self._next)
+            self._next = slot + self.interval  # no await before this, so concurrent acquisitions get own slots
+            if slot > now:
+                await asyncio.sleep(slot - now)
+            if loop.time() >= self._paused_until:
+                return
+
+
+async def broadcast_calendar(
+    bot,
+    recipients: Iterable,
+    text: str,
+    calendar_cls=SimpleCalendar,
+    concurrency: int = 20,
+    rate: float = 25,
+    retries: int = 3,
+    **calendar_kwargs
+) -> BroadcastReport:
+    """Sends message with calendar to every recipient, keyboard is rendered once per distinct
+    locale, month and range of dates and shared by all chats it is sent to
+
+    Args:
+        recipients: chat ids or BroadcastRecipient, iterated lazily so may be a generator over a large table
+        calendar_cls: class of calendar, created with locale of recipient and calendar_kwargs
+        concurrency: sends in flight at once
+        rate: sends started per second, shared by all concurrent sends
+        retries: sends repeated after waiting out flood control (TelegramRetryAfter) before chat fails,
+            all sends are paused while flood control lasts
+    """
+    keyboards = {}
+    failures = {}
+    sent = 0
+    limiter = RateLimiter(rate)
+    recipients = iter(recipients)
+
+    def get_keyboard(recipient: BroadcastRecipient):
+        key = recipient.render_key
+        keyboard = keyboards.get(key)
+        if keyboard is None:
+            calendar = calendar_cls(locale=recipient.locale, **calendar_kwargs)
+            if recipient.min_date or recipient.max_date:
+                calendar.set_dates_range(recipient.min_date, recipient.max_date)
+            view = {name: value for name, value in (("year", recipient.year), ("month", recipient.month)) if value}
+            keyboard = keyboards[key] = calendar.render_calendar(**view)
+        return keyboard
+
+    async def send(recipient: BroadcastRecipient):
+        reply_markup = get_keyboard(recipient)
+        for attempt in range(retries + 1):
+            await limiter.acquire()
+            try:
+                return await bot.send_message(chat_id=recipient.chat_id, text=text, reply_markup=reply_markup)
+            except TelegramRetryAfter as error:
+                if attempt == retries:
+                    raise
+                # every worker waits out flood control, next acquire of this one waits too
+                limiter.pause(error.retry_after)
+
+    async def worker():
+        nonlocal sent
+        # all workers take recipients from one iterator, so there are never more tasks than concurrency
+        for recipient in recipients:
+            if not isinstance(recipient, BroadcastRecipient):
+                recipient = BroadcastRecipient(recipient)
+            try:
+                await send(recipient)
+            except Exception as error:
+                failures[recipient.chat_id] = error
+            else:
+                sent += 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return BroadcastReport(sent, failures, len(keyboards))
@@ -0,0 +1,43 @@
+from functools import lru_cache
+
+from aiogram.types import InlineKeyboardButton
+from pydantic import ConfigDict
+
+
+class StaticButton(InlineKeyboardButton):
+    "Immutable button, same instance is shared between all keyboards it is rendered in"
+    model_config = ConfigDict(frozen=True)
+
+
+@lru_cache(maxsize=8192)
+def pack_callback(callback_cls, **fields) -> str:
+    "Returns packed callback data, result is cached as packing is done for every button of every render"
+    return callback_cls(**fields).pack()
+
+
+class PackedCallback:
+    """Class attribute with callback data packed on first access instead of at import of module,
+    e.g. ignore_callback = PackedCallback(SimpleCalendarCallback, act=SimpleCalAct.ignore)
+    """
+
+    def __init__(self, callback_cls, **fields):
+        self.callback_cls = callback_cls
+        self.fields = fields
+        self.packed = None
+
+    def __get__(self, instance, owner) -> str:
+        if self.packed is None:
+            self.packed = self.callback_cls(**self.fields).pack()
+        return self.packed
+
+
+@lru_cache(maxsize=4096)
+def static_button(text: str, callback_data: str) -> StaticButton:
+    "Returns prebuilt button for text & callback data, calendar type, locale and labels are part of this key"
+    return StaticButton(text=text, callback_data=callback_data)
+
+
+@lru_cache(maxsize=1024)
+def static_row(buttons: tuple) -> tuple:
+    "Returns row of prebuilt buttons for tuple of (text, callback_data) pairs"
+    return tuple(static_button(text, callback_data) for text, callback_data in buttons)
@@ -0,0 +1,318 @@
+"""Cache of rendered keyboards and label sets shared between calendars and worker processes
+
+Keys are versioned, so workers running different releases of package never read keyboards of each other.
+Backend is chosen once on startup of every worker, e.g. for workers on one host:
+
+    from aiogram_calendar.cache import MmapBackend, render_cache
+    render_cache.set_backend(MmapBackend("/dev/shm/aiogram_calendar.cache"))
+
+Only JSON keyboards (start_calendar_json, render_calendar_json) are cached: start_calendar and render_calendar
+build markup models in process from pooled buttons, and keyboards of MultipleCalendar depend on selection,
+so they are never cached. Blocking backends are read by start_calendar_json in a worker thread.
+"""
+import mmap
+import os
+import socket
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from hashlib import blake2b
+from time import monotonic
+from typing import Optional
+
+
+CACHE_VERSION = 1  # has to be increased with every change of rendered keyboards or keys
+
+
+class CacheBackend:
+    "Storage of cached values, keys are str and values are bytes"
+
+    blocking = False  # does network I/O, so it is not called from event loop
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes):
+        raise NotImplementedError
+
+    def clear(self, prefix: str = ""):
+        "Removes keys starting with prefix, backends not able to filter keys remove everything"
+        raise NotImplementedError
+
+
+class LRUBackend(CacheBackend):
+    "Bounded LRU cache in memory of process, safe to use from worker threads"
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self, prefix: str = ""):
+        with self._lock:
+            if not prefix:
+                self._data.clear()
+                return
+            for key in [key for key in self._data if key.startswith(prefix)]:
+                del self._data[key]
+
+
+class MmapBackend(CacheBackend):
+    """Cache in memory mapped file shared by processes of one host, e.g. placed in /dev/shm
+
+    File is split into slots of equal size, key is stored in slot chosen by its hash replacing previous value.
+    Slot keeps digest of key and checksum of value, so no locks are needed: value torn by concurrent write
+    or replaced with value of other key is a cache miss. All processes have to use the same slots and slot_size.
+    """
+
+    HEADER = struct.Struct("<16sII")  # digest of key, length of value, crc32 of value
+
+    def __init__(self, path: str, slots: int = 1024, slot_size: int = 16384):
+        self.path = path
+        self.slots = slots
+        self.slot_size = slot_size
+        size = slots * slot_size
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if os.fstat(fd).st_size < size:
+                os.ftruncate(fd, size)
+            self._map = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+
+    def _locate(self, key: str) -> tuple:
+        digest = blake2b(key.encode(), digest_size=16).digest()
+        return digest, int.from_bytes(digest[:8], "little") % self.slots * self.slot_size
+
+    def get(self, key: str) -> Optional[bytes]:
+        digest, offset = self._locate(key)
+        stored, length, checksum = self.HEADER.unpack_from(self._map, offset)
+        if stored != digest or length > self.slot_size - self.HEADER.size:
+            return None
+        start = offset + self.HEADER.size
+        value = self._map[start:start + length]
+        return value if zlib.crc32(value) == checksum else None
+
+    def set(self, key: str, value: bytes):
+        if len(value) > self.slot_size - self.HEADER.size:
+            return
+        digest, offset = self._locate(key)
+        start = offset + self.HEADER.size
+        self._map[start:start + len(value)] = value
+        self.HEADER.pack_into(self._map, offset, digest, len(value), zlib.crc32(value))
+
+    def clear(self, prefix: str = ""):
+        empty = self.HEADER.pack(bytes(16), 0, 0)
+        for offset in range(0, self.slots * self.slot_size, self.slot_size):
+            self._map[offset:offset + self.HEADER.size] = empty
+
+    def close(self):
+        self._map.close()
+
+
+class RedisError(Exception):
+    "Error reply of Redis server"
+
+
+class RedisBackend(CacheBackend):
+    """Cache in Redis or any server speaking its protocol (KeyDB, Dragonfly, Valkey), no client library needed
+
+    Connection is blocking with a short timeout, every unavailability of server is a cache miss,
+    so bot keeps rendering keyboards itself while cache is down. After a connection error server
+    is not contacted for retry_after seconds instead of blocking every render for the timeout.
+    """
+
+    blocking = True
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 6379,
+        db: int = 0,
+        password: str = None,
+        ttl: int = 24 * 60 * 60,
+        timeout: float = 0.5,
+        connect=None,
+        retry_after: float = 30,
+    ):
+        """
+        Args:
+            ttl: seconds keyboards are kept for, None - until evicted by server
+            connect: callable returning connected socket, socket.create_connection to host and port if None
+            retry_after: seconds commands are skipped as cache misses after connection error
+        """
+        self.db = db
+        self.password = password
+        self.ttl = ttl
+        self._connect = connect or (lambda: socket.create_connection((host, port), timeout=timeout))
+        self._sock = None
+        self._buffer = b""
+        self._lock = threading.Lock()  # connection is shared by threads rendering keyboards
+        self.retry_after = retry_after
+        self._down_until = 0.0
+
+    def _open(self):
+        self._sock = self._connect()
+        self._buffer = b""
+        if self.password:
+            self._command("AUTH", self.password)
+        if self.db:
+            self._command("SELECT", self.db)
+
+    def _close(self):
+        if self._sock is not None:
+            self._sock.close()
+        self._sock = None
+
+    def _read_line(self) -> bytes:
+        while b"\r\n" not in self._buffer:
+            chunk = self._sock.recv(65536)
+            if not chunk:
+                raise ConnectionError("Connection closed by server")
+            self._buffer += chunk
+        line, self._buffer = self._buffer.split(b"\r\n", 1)
+        return line
+
+    def _read_exact(self, length: int) -> bytes:
+        while len(self._buffer) < length + 2:
+            chunk = self._sock.recv(65536)
+            if not chunk:
+                raise ConnectionError("Connection closed by server")
+            self._buffer += chunk
+        data, self._buffer = self._buffer[:length], self._buffer[length + 2:]
+        return data
+
+    def _read_reply(self):
+        line = self._read_line()
+        kind, payload = line[:1], line[1:]
+        if kind == b"+":
+            return payload
+        if kind == b"-":
+            raise RedisError(payload.decode(errors="replace"))
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            return None if length < 0 else self._read_exact(length)
+        if kind == b"*":
+            length = int(payload)
+            return None if length < 0 else [self._read_reply() for _ in range(length)]
+        raise RedisError(f"Unknown reply {line!r}")
+
+    def _command(self, *args):
+        if self._sock is None:
+            self._open()
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            arg = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        self._sock.sendall(b"".join(parts))
+        return self._read_reply()
+
+    def _safe_command(self, *args):
+        """Runs command, connection is dropped on errors to be opened again by next command,
+        or after retry_after seconds if server is not reachable
+        """
+        if monotonic() < self._down_until:
+            return None
+        with self._lock:
+            try:
+                return self._command(*args)
+            except OSError:
+                self._close()
+                self._down_until = monotonic() + self.retry_after
+                return None
+            except RedisError:
+                self._close()
+                return None
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._safe_command("GET", key)
+
+    def set(self, key: str, value: bytes):
+        if self.ttl:
+            self._safe_command("SET", key, value, "EX", self.ttl)
+        else:
+            self._safe_command("SET", key, value)
+
+    def clear(self, prefix: str = ""):
+        cursor = b"0"
+        while True:
+            reply = self._safe_command("SCAN", cursor, "MATCH", prefix + "*", "COUNT", 1000)
+            if reply is None:
+                return
+            cursor, keys = reply
+            if keys:
+                self._safe_command("DEL", *keys)
+            if cursor == b"0":
+                return
+
+
+class SharedCache:
+    """Cache with versioned keys over a backend, values are bytes and keys are tuples of anything having
+    the same repr in every process (str, int, datetime, tuples of them)
+
+    Values of a key never change, so shared backends are fronted with a small LRU in memory of process.
+    """
+
+    def __init__(self, backend: CacheBackend = None, namespace: str = "aiogram_calendar", local_size: int = 256):
+        self.namespace = namespace
+        self.local_size = local_size
+        self.set_backend(backend or LRUBackend())
+
+    @property
+    def prefix(self) -> str:
+        return f"{self.namespace}:v{CACHE_VERSION}:"
+
+    @property
+    def blocking(self) -> bool:
+        return self.backend.blocking
+
+    def set_backend(self, backend: CacheBackend):
+        self.backend = backend
+        shared = not isinstance(backend, LRUBackend)
+        self._local = LRUBackend(self.local_size) if shared and self.local_size else None
+
+    def make_key(self, kind: str, key: tuple) -> str:
+        digest = blake2b(repr(key).encode(), digest_size=16).hexdigest()
+        return f"{self.prefix}{kind}:{digest}"
+
+    def get(self, kind: str, key: tuple) -> Optional[bytes]:
+        cache_key = self.make_key(kind, key)
+        if self._local is not None:
+            value = self._local.get(cache_key)
+            if value is not None:
+                return value
+        value = self.backend.get(cache_key)
+        if value is not None and self._local is not None:
+            self._local.set(cache_key, value)
+        return value
+
+    def set(self, kind: str, key: tuple, value: bytes):
+        cache_key = self.make_key(kind, key)
+        if self._local is not None:
+            self._local.set(cache_key, value)
+        self.backend.set(cache_key, value)
+
+    def clear(self):
+        if self._local is not None:
+            self._local.clear()
+        self.backend.clear(self.prefix)
+
+
+render_cache = SharedCache()
@@ -1,20 +1,127 @@
+import asyncio
 import calendar
+import json
 import locale
+from functools import lru_cache
+from typing import Optional, Union
 
-from aiogram.types import User
+from aiogram.types import InlineKeyboardMarkup, User
 from datetime import datetime
 
-from .schemas import CalendarLabels
+from .cache import render_cache
+from .keyboard import DICT_TARGET, MARKUP_TARGET, EpochTarget, dumps_markup
+from .schemas import DEFAULT_LABELS, CalendarLabels, Labels, get_labels
 
 
-async def get_user_locale(from_user: User) -> str:
-    "Returns user locale in format en_US, accepts User instance from Message, CallbackData etc"
-    loc = from_user.language_code
-    return locale.locale_alias[loc].split(".")[0]
+MAX_KEYBOARD_BUTTONS = 100  # Telegram limit of buttons in inline keyboard
+STALE_NOTICE_CACHE_TIME = 3600  # seconds Telegram clients show cached notice for taps on outdated keyboard
+# epoch has to fit 10 digits: the longest callback data with MAX_EPOCH,
+# multiple_calendar:UNSELECT_ALL_WEEKDAYS:2030:12::6:4294967295: is 62 bytes of Telegram limit of 64 bytes,
+# so only 2 bytes are left for new fields
+MAX_EPOCH = 2 ** 32 - 1
+
+# territories where week starts on Sunday or Saturday (CLDR week data), all others start on Monday
+SUNDAY_FIRST_TERRITORIES = frozenset((
+    "AG", "AS", "BD", "BR", "BS", "BT", "BW", "BZ", "CA", "CO", "DM", "DO", "ET", "GT", "GU", "HK", "HN", "ID",
+    "IL", "IN", "JM", "JP", "KE", "KH", "KR", "LA", "MH", "MM", "MO", "MT", "MX", "MZ", "NI", "NP", "PA", "PE",
+    "PH", "PK", "PR", "PT", "PY", "SA", "SG", "SV", "TH", "TT", "TW", "UM", "US", "VE", "VI", "WS", "YE", "ZA",
+    "ZW",
+))
+SATURDAY_FIRST_TERRITORIES = frozenset((
+    "AE", "AF", "BH", "DJ", "DZ", "EG", "IQ", "IR", "JO", "KW", "LY", "OM", "QA", "SD", "SY",
+))
+
+
+async def get_user_locale(from_user: User, default: str = None) -> Optional[str]:
+    """Returns user locale in format en_US, accepts User instance from Message, CallbackData etc
+    If user language is unknown or not supported by system returns default (English captions if None)
+    """
+    return resolve_locale(from_user.language_code, default)
+
+
+@lru_cache(maxsize=256)
+def resolve_locale(language_code: Optional[str], default: str = None) -> Optional[str]:
+    """Maps Telegram language code to locale in format pt_BR supported by system, results are memoized
+
+    Code is normalized and shortened until supported locale is found: pt-br -> pt_BR -> pt -> default.
+    Found locale has its labels loaded into labels cache already.
+    """
+    if not language_code:
+        return default
+
+    parts = language_code.strip().replace("-", "_").lower().split("_")
+    for i in range(len(parts), 0, -1):
+        alias = locale.locale_alias.get("_".join(parts[:i]))
+        if alias is None:
+            continue
+        loc = alias.split(".")[0]
+        try:
+            get_locale_labels(loc)
+        except locale.Error:
+            # locale is not installed in the system
+            continue
+        return loc
+
+    return default
+
+
+def get_first_weekday(loc: str = None) -> int:
+    "Returns first day of week (0 - Monday, 6 - Sunday) for locale in format en_US, Monday if locale is not set"
+    if not loc:
+        return calendar.MONDAY
+    territory = loc.split(".")[0].split("@")[0].partition("_")[2].upper()
+    if territory in SUNDAY_FIRST_TERRITORIES:
+        return calendar.SUNDAY
+    if territory in SATURDAY_FIRST_TERRITORIES:
+        return calendar.SATURDAY
+    return calendar.MONDAY
+
+
+@lru_cache(maxsize=None)
+def get_locale_labels(loc: str = None) -> tuple:
+    "Returns (days_of_week, months) abbreviations for locale, days of week are Monday-first"
+    if not loc:
+        return DEFAULT_LABELS.days_of_week, DEFAULT_LABELS.months
+    cached = render_cache.get("labels", (loc,))
+    if cached is not None:
+        days_of_week, months = json.loads(cached)
+        return tuple(days_of_week), tuple(months)
+    # getting month names and days of week in specified locale
+    with calendar.different_locale(loc):
+        labels = tuple(calendar.day_abbr), tuple(calendar.month_abbr[1:])
+    render_cache.set("labels", (loc,), json.dumps(labels, ensure_ascii=False).encode())
+    return labels
+
+
+@lru_cache(maxsize=None)
+def get_week_layout(days_of_week: tuple, firstweekday: int) -> tuple:
+    """Returns days of week as (weekday, label) pairs in display order, weekday is 0 for Monday,
+    days_of_week are Monday-first labels of calendar
+    """
+    return tuple(((firstweekday + i) % 7, days_of_week[(firstweekday + i) % 7]) for i in range(7))
+
+
+def shift_month(year: int, month: int, months: int) -> tuple:
+    "Returns (year, month) moved by amount of months, backwards if months is negative"
+    year, month = divmod(year * 12 + month - 1 + months, 12)
+    return year, month + 1
+
+
+@lru_cache(maxsize=1024)
+def get_month_days(year: int, month: int, firstweekday: int) -> tuple:
+    "Returns weeks of month as tuples of day numbers starting from firstweekday, days outside of month are 0"
+    return tuple(tuple(week) for week in calendar.Calendar(firstweekday).monthdayscalendar(year, month))
 
 
 class GenericCalendar:
 
+    __slots__ = (
+        "_labels", "locale", "firstweekday", "_week_layout", "min_date", "max_date", "show_alerts", "selected_days",
+        "epoch", "stale_notice", "stale_rerender", "completion_template",
+    )
+
+    cache_renders = True  # rendered keyboard depends only on calendar settings, view and todays date
+
     def __init__(
         self,
         locale: str = None,
@@ -24,6 +131,12 @@ class GenericCalendar:
         back_button: str = None,
         show_alerts: bool = False,
         selected_days: list[str] = None,
+        firstweekday: int = None,
+        labels: Union[CalendarLabels, Labels] = None,
+        epoch: int = None,
+        stale_notice: str = "This calendar is outdated",
+        stale_rerender: bool = False,
+        completion_template: str = None,
     ) -> None:
         """Pass labels if you need to have alternative language of buttons
 
@@ -32,54 +145,168 @@ class GenericCalendar:
         cancel_btn (str): label for button Cancel to cancel date input
         today_btn (str): label for button Today to set calendar back to todays date
         show_alerts (bool): defines how the date range error would shown (defaults to False)
+        firstweekday (int): first day of week, 0 - Monday ... 6 - Sunday, if None - derived from locale
+        labels (CalendarLabels): all labels of calendar, take precedence over labels of locale,
+            captions passed as separate parameters take precedence over them
+        epoch (int): number from 0 to MAX_EPOCH stamped into callback data of buttons, e.g. increased on every
+            deploy or changed monthly, taps on keyboards rendered with other epoch are stale and are not processed.
+            Keyboards packed by releases with other fields of callback data can not be unpacked
+            and are dropped by CallbackData.filter(), create_calendar_router handles them as stale
+        stale_notice (str): answer to stale taps, it is cached by Telegram client
+        stale_rerender (bool): stale taps replace keyboard with the current view instead of answering notice
+        completion_template (str): text message of calendar is replaced with after selection, formatted with
+            selected date, e.g. "You selected {date:%d/%m/%Y}", query is answered by calendar then;
+            if None - only keyboard is removed
         """
-        self._labels = CalendarLabels()
-        if locale:
-            # getting month names and days of week in specified locale
-            with calendar.different_locale(locale):
-                self._labels.days_of_week = list(calendar.day_abbr)
-                self._labels.months = calendar.month_abbr[1:]
-
-        if cancel_btn:
-            self._labels.cancel_caption = cancel_btn
-
-        if today_btn:
-            self._labels.today_caption = today_btn
+        if isinstance(labels, CalendarLabels):
+            labels = Labels.from_model(labels)
+        if labels:
+            days_of_week, months = labels.days_of_week, labels.months
+        else:
+            labels = DEFAULT_LABELS
+            days_of_week, months = get_locale_labels(locale)
+        # labels are interned, calendars with the same labels share one instance
+        self._labels = get_labels(
+            days_of_week,
+            months,
+            cancel_btn or labels.cancel_caption,
+            back_button or labels.back_caption,
+            today_btn or labels.today_caption,
+            save_button or labels.save_caption,
+        )
 
-        if save_button:
-            self._labels.save_caption = save_button
-
-        if back_button:
-            self._labels.back_caption = back_button
+        self.locale = locale
+        self.firstweekday = get_first_weekday(locale) if firstweekday is None else firstweekday % 7
+        self._week_layout = get_week_layout(self._labels.days_of_week, self.firstweekday)
 
         self.min_date = None
         self.max_date = None
         self.show_alerts = show_alerts
         self.selected_days = selected_days or []
+        if epoch is not None and not 0 <= epoch <= MAX_EPOCH:
+            raise ValueError(f"Epoch have to be between 0 and {MAX_EPOCH}")
+        self.epoch = epoch
+        self.stale_notice = stale_notice
+        self.stale_rerender = stale_rerender
+        self.completion_template = completion_template
 
     def set_dates_range(self, min_date: datetime, max_date: datetime):
         """Sets range of minimum & maximum dates"""
         self.min_date = min_date
         self.max_date = max_date
 
-    async def process_day_select(self, data, query):
-        """Checks selected date is in allowed range of dates"""
-        date = datetime(int(data.year), int(data.month), int(data.day))
+    def _render_calendar(self, target, *args, **kwargs):
+        """Builds keyboard of start_calendar with render target (keyboard.MARKUP_TARGET or keyboard.DICT_TARGET)"""
+        raise NotImplementedError
+
+    def _get_render_key(self, args: tuple, kwargs: dict) -> tuple:
+        """Returns key of rendered keyboard for cache, includes everything keyboard depends on"""
+        return (
+            type(self).__name__,
+            self.locale,
+            self.firstweekday,
+            self._labels,
+            self.epoch,
+            self.min_date,
+            self.max_date,
+            args,
+            tuple(sorted(kwargs.items())),
+            datetime.now().date(),
+        )
+
+    # synchronous render API, no I/O is done so it can be called from sync code or worker threads,
+    # async start_calendar* methods are thin wrappers kept for handlers
+
+    def _target(self, target):
+        """Returns render target stamping epoch of calendar into callback data if epoch is set"""
+        return target if self.epoch is None else EpochTarget(target, self.epoch)
+
+    def render_calendar(self, *args, **kwargs) -> InlineKeyboardMarkup:
+        """Same as start_calendar, accepts the same arguments"""
+        return self._render_calendar(self._target(MARKUP_TARGET), *args, **kwargs)
+
+    def render_calendar_dict(self, *args, **kwargs) -> dict:
+        """Same as render_calendar but returns reply_markup as plain dict of Bot API without building models"""
+        return self._render_calendar(self._target(DICT_TARGET), *args, **kwargs)
+
+    def render_calendar_json(self, *args, **kwargs) -> bytes:
+        """Same as render_calendar but returns reply_markup serialized to JSON,
+        keyboards not depending on selection are cached per calendar settings and view
+        """
+        if not self.cache_renders:
+            return dumps_markup(self.render_calendar_dict(*args, **kwargs))
+
+        key = self._get_render_key(args, kwargs)
+        rendered = render_cache.get("markup", key)
+        if rendered is None:
+            rendered = dumps_markup(self.render_calendar_dict(*args, **kwargs))
+            render_cache.set("markup", key, rendered)
+        return rendered
+
+    async def start_calendar_dict(self, *args, **kwargs) -> dict:
+        """Same as start_calendar but returns reply_markup as plain dict of Bot API without building models"""
+        return self.render_calendar_dict(*args, **kwargs)
+
+    async def start_calendar_json(self, *args, **kwargs) -> bytes:
+        """Same as start_calendar but returns reply_markup serialized to JSON,
+        keyboards not depending on selection are cached per calendar settings and view.
+        Cache with blocking backend (e.g. Redis) is read in a worker thread, so event loop is not stalled
+        """
+        if self.cache_renders and render_cache.blocking:
+            return await asyncio.to_thread(self.render_calendar_json, *args, **kwargs)
+        return self.render_calendar_json(*args, **kwargs)
 
-        if self.min_date and self.min_date > date:
+    async def process_stale(self, query, data) -> bool:
+        """Checks tap was made on keyboard rendered with the current epoch, otherwise answers it with notice
+        or replaces keyboard with the current view and returns True, tap does not need processing then.
+        data is None for taps which callback data can not be unpacked, e.g. made on keyboards of older releases
+        """
+        if data is not None and (self.epoch is None or data.epoch == self.epoch):
+            return False
+        if self.stale_rerender:
+            await query.message.edit_reply_markup(reply_markup=self.render_calendar())
+            await query.answer()
+        else:
+            await query.answer(self.stale_notice, cache_time=STALE_NOTICE_CACHE_TIME)
+        return True
+
+    async def _check_date_range(self, date: datetime, query, until: datetime = None) -> bool:
+        """Checks period from date to until (same as date if not passed) intersects allowed range of dates,
+        answers query with error otherwise
+        """
+        if self.min_date and self.min_date > (until or date):
             await query.answer(
                 f'The date have to be later {self.min_date.strftime("%d/%m/%Y")}',
                 show_alert=self.show_alerts
             )
-            return False, None
+            return False
 
         elif self.max_date and self.max_date < date:
             await query.answer(
                 f'The date have to be before {self.max_date.strftime("%d/%m/%Y")}',
                 show_alert=self.show_alerts
             )
+            return False
+
+        return True
+
+    async def process_day_select(self, data, query):
+        """Checks selected date is in allowed range of dates"""
+        date = datetime(int(data.year), int(data.month), int(data.day))
+
+        if not await self._check_date_range(date, query):
             return False, None
 
-        await query.message.delete_reply_markup()  # removing inline keyboard
+        await self.complete_selection(query, date)
 
         return True, date
+
+    async def complete_selection(self, query, date: datetime):
+        """Removes keyboard of selected date. In completion mode text and keyboard are replaced
+        with confirmation by a single edit and query is answered, so handler does not need to send anything
+        """
+        if self.completion_template is None:
+            await query.message.delete_reply_markup()  # removing inline keyboard
+            return
+        await query.message.edit_text(self.completion_template.format(date=date))
+        await query.answer()
@@ -0,0 +1,190 @@
+from datetime import datetime, time, timedelta
+from functools import lru_cache
+
+from aiogram.types import CallbackQuery, InlineKeyboardMarkup
+
+from .buttons import PackedCallback, pack_callback
+from .common import MAX_KEYBOARD_BUTTONS
+from .keyboard import MARKUP_TARGET
+from .schemas import DateTimeCalAct, DateTimeCalendarCallback
+from .simple_calendar import SimpleCalendar
+
+
+MINUTES_IN_DAY = 24 * 60
+HOURS_ROW_WIDTH = 6
+
+
+def to_minutes(value: time) -> int:
+    "Returns time of day as minutes since midnight"
+    return value.hour * 60 + value.minute
+
+
+def format_minutes(minute: int) -> str:
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+@lru_cache(maxsize=64)
+def get_time_slots(step: int, first: int, last: int) -> tuple:
+    "Returns (label, minute) pairs of slots from first to last minute of day (exclusive) with step in minutes"
+    return tuple((format_minutes(minute), minute) for minute in range(first, last, step))
+
+
+@lru_cache(maxsize=64)
+def get_slots_grid(step: int, first: int, last: int, row_width: int) -> tuple:
+    """Returns slots of day as rows of (label, minute) pairs, grid is the same for every date
+    so it is built once per step and day bounds
+    """
+    slots = get_time_slots(step, first, last)
+    return tuple(slots[i:i + row_width] for i in range(0, len(slots), row_width))
+
+
+@lru_cache(maxsize=64)
+def get_hours_grid(step: int, first: int, last: int) -> tuple:
+    "Returns hours having at least one slot as rows of (label, minute of hour start) pairs"
+    hours = sorted({minute // 60 for _, minute in get_time_slots(step, first, last)})
+    buttons = tuple((f"{hour:02d}", hour * 60) for hour in hours)
+    return tuple(buttons[i:i + HOURS_ROW_WIDTH] for i in range(0, len(buttons), HOURS_ROW_WIDTH))
+
+
+@lru_cache(maxsize=1024)
+def get_hour_slots_grid(step: int, first: int, last: int, row_width: int, hour: int) -> tuple:
+    "Returns slots of one hour as rows of (label, minute) pairs"
+    slots = tuple(slot for slot in get_time_slots(step, first, last) if slot[1] // 60 == hour)
+    return tuple(slots[i:i + row_width] for i in range(0, len(slots), row_width))
+
+
+class DateTimeCalendar(SimpleCalendar):
+    """Calendar picking date and time in one message: after a day is picked the same message is edited
+    to show time slots of that day, or hours and then minutes if slots do not fit into one keyboard
+    """
+
+    __slots__ = ("time_step", "day_start", "day_end", "slots_per_row")
+
+    callback_cls = DateTimeCalendarCallback
+    # placeholder for no answer buttons, packed on first use
+    ignore_callback = PackedCallback(DateTimeCalendarCallback, act=DateTimeCalAct.ignore)
+
+    def __init__(
+        self,
+        *args,
+        time_step: int = 30,
+        day_start: time = time(0, 0),
+        day_end: time = None,
+        slots_per_row: int = 4,
+        **kwargs
+    ) -> None:
+        """Accepts all parameters of SimpleCalendar and
+
+        Parameters:
+        time_step (int): minutes between time slots
+        day_start (time): time of the first slot of day
+        day_end (time): slots start before this time, if None - until the end of day
+        slots_per_row (int): amount of time slots in one row of keyboard
+        """
+        super().__init__(*args, **kwargs)
+        if not 0 < time_step < MINUTES_IN_DAY:
+            raise ValueError("Time step have to be between 1 minute and 1 day")
+        self.time_step = time_step
+        self.day_start = to_minutes(day_start)
+        self.day_end = MINUTES_IN_DAY if day_end is None else to_minutes(day_end)
+        self.slots_per_row = slots_per_row
+        if not get_time_slots(self.time_step, self.day_start, self.day_end):
+            raise ValueError("There are no time slots between start and end of day")
+
+    def _get_render_key(self, args: tuple, kwargs: dict) -> tuple:
+        return super()._get_render_key(args, kwargs) + (self.time_step, self.day_start, self.day_end)
+
+    @property
+    def pick_hour_first(self) -> bool:
+        "Slots not fitting into keyboard with header and navigation rows are picked in two steps: hour, then minute"
+        slots = len(get_time_slots(self.time_step, self.day_start, self.day_end))
+        return slots + 3 > MAX_KEYBOARD_BUTTONS
+
+    def render_time(self, year: int, month: int, day: int, hour: int = None) -> InlineKeyboardMarkup:
+        """Creates an inline keyboard with time slots of specified date, or with hours if slots
+        are picked in two steps and hour is not passed
+        """
+        return self._render_time(self._target(MARKUP_TARGET), year, month, day, hour)
+
+    async def _get_time_kb(self, year: int, month: int, day: int, hour: int = None) -> InlineKeyboardMarkup:
+        """Async version of render_time"""
+        return self.render_time(year, month, day, hour)
+
+    def _render_time(self, target, year: int, month: int, day: int, hour: int = None):
+        """Builds keyboard with time slots of date with render target"""
+        grid_args = self.time_step, self.day_start, self.day_end
+        if not self.pick_hour_first:
+            act, grid = DateTimeCalAct.time, get_slots_grid(*grid_args, self.slots_per_row)
+        elif hour is None:
+            act, grid = DateTimeCalAct.hour, get_hours_grid(*grid_args)
+        else:
+            act, grid = DateTimeCalAct.time, get_hour_slots_grid(*grid_args, self.slots_per_row, hour)
+
+        if hour is None or not self.pick_hour_first:
+            # back to days of month
+            back_callback = pack_callback(self.callback_cls, act=DateTimeCalAct.back, year=year, month=month, day=1)
+        else:
+            # back to hours of day
+            back_callback = pack_callback(self.callback_cls, act=DateTimeCalAct.day, year=year, month=month, day=day)
+
+        kb = [target.row(((f"{day} {self._labels.months[month - 1]} {year}", self.ignore_callback),))]
+        for row in grid:
+            kb.append(target.row(tuple(
+                (label, pack_callback(self.callback_cls, act=act, year=year, month=month, day=day, minute=minute))
+                for label, minute in row
+            )))
+        kb.append(target.row((
+            (self._labels.back_caption, back_callback),
+            (
+                self._labels.cancel_caption,
+                pack_callback(self.callback_cls, act=DateTimeCalAct.cancel, year=year, month=month, day=1),
+            ),
+        )))
+        return target.markup(kb, row_width=self.slots_per_row)
+
+    async def process_selection(self, query: CallbackQuery, data: DateTimeCalendarCallback) -> tuple:
+        """
+        Process the callback_query. Navigation in month and picking day or hour edit the message with
+        a new keyboard, picking time removes the keyboard.
+        :param query: callback_query, as provided by the CallbackQueryHandler
+        :param data: callback_data, dictionary, set by calendar_callback
+        :return: Returns a tuple (Boolean,datetime), indicating if a date and time are selected
+                    and returning the datetime if so.
+        """
+        return_data = (False, None)
+
+        if data.act != DateTimeCalAct.ignore and await self.process_stale(query, data):
+            return return_data
+
+        # user picked a day, showing time of day in the same message
+        if data.act == DateTimeCalAct.day:
+            date = datetime(int(data.year), int(data.month), int(data.day))
+            first = date + timedelta(minutes=self.day_start)
+            last = date + timedelta(minutes=get_time_slots(self.time_step, self.day_start, self.day_end)[-1][1])
+            if await self._check_date_range(first, query, until=last):
+                await query.message.edit_reply_markup(
+                    reply_markup=await self._get_time_kb(date.year, date.month, date.day)
+                )
+            return return_data
+
+        # user picked an hour, showing its minutes
+        if data.act == DateTimeCalAct.hour:
+            await query.message.edit_reply_markup(
+                reply_markup=await self._get_time_kb(int(data.year), int(data.month), int(data.day), data.minute // 60)
+            )
+            return return_data
+
+        # user picked time, return date with time
+        if data.act == DateTimeCalAct.time:
+            date = datetime(int(data.year), int(data.month), int(data.day)) + timedelta(minutes=int(data.minute))
+            if not await self._check_date_range(date, query):
+                return return_data
+            await self.complete_selection(query, date)
+            return True, date
+
+        # user returns from time to days of month
+        if data.act == DateTimeCalAct.back:
+            await self._update_calendar(query, datetime(int(data.year), int(data.month), 1))
+            return return_data
+
+        return await super().process_selection(query, data)
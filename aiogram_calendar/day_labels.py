@@ -0,0 +1,60 @@
+from .schemas import highlight, select, superscript
+
+
+# styles of day labels, can be combined with |
+PLAIN = 0
+SUPERSCRIPT = 1  # day out of allowed range of dates
+STRIKETHROUGH = 2
+SELECTED = 4
+HIGHLIGHTED = 8  # today
+
+
+def strikethrough(text):
+    return "".join(char + "\u0336" for char in text)  # combining long stroke overlay
+
+
+# formatting of label applied in order of registration, custom styles come after built-in ones,
+# selection and highlighting are always the last, so custom styles are highlighted as well
+_styles = [(SUPERSCRIPT, superscript), (STRIKETHROUGH, strikethrough)]
+_outer_styles = [(SELECTED, select), (HIGHLIGHTED, highlight)]
+_tables = {}
+
+
+def register_day_style(formatter) -> int:
+    """Registers custom style of day labels, returns its flag to combine with other styles
+
+    formatter (callable): accepts label text, returns formatted text, it is called once per day and
+        combination of styles when labels table is compiled
+    """
+    flag = 1 << (len(_styles) + len(_outer_styles))
+    _styles.append((flag, formatter))
+    return flag
+
+
+def _compile_labels(style: int) -> tuple:
+    labels = []
+    for day in range(32):
+        text = str(day)
+        for flag, formatter in _styles + _outer_styles:
+            if style & flag:
+                text = formatter(text)
+        labels.append(text)
+    return tuple(labels)
+
+
+def get_day_labels(style: int = PLAIN) -> tuple:
+    "Returns labels of days 0-31 in style, table is compiled on the first use of combination of styles"
+    labels = _tables.get(style)
+    if labels is None:
+        labels = _tables[style] = _compile_labels(style)
+    return labels
+
+
+def day_label(day: int, style: int = PLAIN) -> str:
+    "Returns label of day of month in style"
+    return get_day_labels(style)[day]
+
+
+# compiling combinations of built-in styles in advance
+for _style in range((SUPERSCRIPT | STRIKETHROUGH | SELECTED | HIGHLIGHTED) + 1):
+    get_day_labels(_style)
@@ -1,181 +1,293 @@
-import calendar
-from datetime import datetime
+from datetime import date, datetime
+from functools import lru_cache
 
-from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from aiogram.types import InlineKeyboardMarkup
 from aiogram.types import CallbackQuery
 
-from .schemas import DialogCalendarCallback, DialogCalAct, highlight, superscript
-from .common import GenericCalendar
+from .schemas import DialogCalendarCallback, DialogCalAct, highlight
+from . import day_labels
+from .buttons import PackedCallback, pack_callback
+from .common import GenericCalendar, get_month_days
+from .keyboard import MARKUP_TARGET
+
+
+# Layouts of keyboards are tuples of rows with (text, callback_data) pairs, they depend only on calendar
+# settings, viewed period and todays date, so every level of dialog is cached independently of user
+
+
+def year_text(year: int, now_year: int) -> str:
+    return str(year) if year != now_year else highlight(year)
+
+
+def cancel_button(cancel_caption: str, year: int) -> tuple:
+    return cancel_caption, pack_callback(DialogCalendarCallback, act=DialogCalAct.cancel, year=year, month=1, day=1)
+
+
+def century_text(year: int) -> str:
+    "Returns caption of ten decades ending with decade of year"
+    decade = year - year % 10
+    return f"{decade - 90}–{decade + 9}"
+
+
+@lru_cache(maxsize=256)
+def get_century_layout(decade: int, cancel_caption: str, now_year: int) -> tuple:
+    """Layout with ten decades ending with decade, so from the current year it covers about the last century.
+    Pass the first year of decade, every year of decade shares one layout
+    """
+    now_decade = now_year - now_year % 10
+
+    def decade_button(value):
+        text = f"{value}–{(value + 9) % 100:02d}"
+        return (
+            text if value != now_decade else highlight(text),
+            pack_callback(DialogCalendarCallback, act=DialogCalAct.decade, year=value, month=-1, day=-1),
+        )
+
+    return (
+        tuple(decade_button(value) for value in range(decade - 90, decade - 40, 10)),
+        tuple(decade_button(value) for value in range(decade - 40, decade + 10, 10)),
+        (
+            (
+                '<<',
+                pack_callback(DialogCalendarCallback, act=DialogCalAct.century, year=decade - 100, month=-1, day=-1),
+            ),
+            cancel_button(cancel_caption, decade),
+            (
+                '>>',
+                pack_callback(DialogCalendarCallback, act=DialogCalAct.century, year=decade + 100, month=-1, day=-1),
+            ),
+        ),
+    )
+
+
+@lru_cache(maxsize=1024)
+def get_decade_layout(decade: int, cancel_caption: str, now_year: int) -> tuple:
+    """Layout with years of decade, pass its first year so every year of decade shares one layout"""
+
+    def year_button(value):
+        return (
+            year_text(value, now_year),
+            pack_callback(DialogCalendarCallback, act=DialogCalAct.set_y, year=value, month=-1, day=-1),
+        )
+
+    return (
+        tuple(year_button(value) for value in range(decade, decade + 5)),
+        tuple(year_button(value) for value in range(decade + 5, decade + 10)),
+        (
+            ('<<', pack_callback(DialogCalendarCallback, act=DialogCalAct.decade, year=decade - 10, month=-1, day=-1)),
+            (
+                f"{decade}–{decade + 9}",
+                pack_callback(DialogCalendarCallback, act=DialogCalAct.century, year=decade, month=-1, day=-1),
+            ),
+            cancel_button(cancel_caption, decade),
+            ('>>', pack_callback(DialogCalendarCallback, act=DialogCalAct.decade, year=decade + 10, month=-1, day=-1)),
+        ),
+    )
+
+
+@lru_cache(maxsize=1024)
+def get_years_layout(year: int, cancel_caption: str, now_year: int) -> tuple:
+    """Layout with five years around year"""
+    return (
+        tuple(
+            (
+                year_text(value, now_year),
+                pack_callback(DialogCalendarCallback, act=DialogCalAct.set_y, year=value, month=-1, day=-1),
+            )
+            for value in range(year - 2, year + 3)
+        ),
+        (
+            ('<<', pack_callback(DialogCalendarCallback, act=DialogCalAct.prev_y, year=year, month=-1, day=-1)),
+            (
+                century_text(year),
+                pack_callback(DialogCalendarCallback, act=DialogCalAct.century, year=year, month=-1, day=-1),
+            ),
+            cancel_button(cancel_caption, year),
+            ('>>', pack_callback(DialogCalendarCallback, act=DialogCalAct.next_y, year=year, month=1, day=1)),
+        ),
+    )
+
+
+@lru_cache(maxsize=1024)
+def get_months_layout(year: int, cancel_caption: str, months: tuple, now_year: int, now_month: int) -> tuple:
+    """Layout with months of year"""
+
+    def month_button(month):
+        month_str = months[month - 1]
+        return (
+            highlight(month_str) if now_month == month and now_year == year else month_str,
+            pack_callback(DialogCalendarCallback, act=DialogCalAct.set_m, year=year, month=month, day=-1),
+        )
+
+    return (
+        (
+            cancel_button(cancel_caption, year),
+            (
+                year_text(year, now_year),
+                pack_callback(DialogCalendarCallback, act=DialogCalAct.start, year=year, month=-1, day=-1),
+            ),
+            (" ", DialogCalendar.ignore_callback),
+        ),
+        # two rows with 6 months buttons
+        tuple(month_button(month) for month in range(1, 7)),
+        tuple(month_button(month) for month in range(7, 13)),
+    )
+
+
+@lru_cache(maxsize=1024)
+def get_days_layout(
+    year: int,
+    month: int,
+    cancel_caption: str,
+    months: tuple,
+    week_layout: tuple,
+    firstweekday: int,
+    min_date: datetime,
+    max_date: datetime,
+    today: date,
+) -> tuple:
+    """Layout with days of month"""
+    is_current_month = today.month == month and today.year == year
+
+    month_str = months[month - 1]
+    layout = [(
+        cancel_button(cancel_caption, year),
+        (
+            year_text(year, today.year),
+            pack_callback(DialogCalendarCallback, act=DialogCalAct.start, year=year, month=-1, day=-1),
+        ),
+        (
+            highlight(month_str) if is_current_month else month_str,
+            pack_callback(DialogCalendarCallback, act=DialogCalAct.set_y, year=year, month=-1, day=-1),
+        ),
+    )]
+
+    layout.append(tuple(
+        (highlight(label) if is_current_month and today.weekday() == weekday else label, DialogCalendar.ignore_callback)
+        for weekday, label in week_layout
+    ))
+
+    def get_day_style(day):
+        date_to_check = datetime(year, month, day)
+        style = day_labels.PLAIN
+        if (min_date and date_to_check < min_date) or (max_date and date_to_check > max_date):
+            style |= day_labels.SUPERSCRIPT
+        if is_current_month and today.day == day:
+            style |= day_labels.HIGHLIGHTED
+        return style
+
+    for week in get_month_days(year, month, firstweekday):
+        layout.append(tuple(
+            (
+                day_labels.day_label(day, get_day_style(day)),
+                DialogCalendarCallback(act=DialogCalAct.day, year=year, month=month, day=day).pack(),
+            ) if day else (" ", DialogCalendar.ignore_callback)
+            for day in week
+        ))
+    return tuple(layout)
 
 
 class DialogCalendar(GenericCalendar):
 
-    ignore_callback = DialogCalendarCallback(act=DialogCalAct.ignore).pack()    # placeholder for no answer buttons
+    __slots__ = ()
 
-    async def _get_month_kb(self, year: int):
+    callback_cls = DialogCalendarCallback  # callback data of buttons, its prefix routes taps to calendar
+    # placeholder for no answer buttons, packed on first use
+    ignore_callback = PackedCallback(DialogCalendarCallback, act=DialogCalAct.ignore)
+
+    @staticmethod
+    def _render_layout(target, layout: tuple, row_width: int):
+        """Builds keyboard from layout with render target"""
+        return target.markup([target.row(row) for row in layout], row_width=row_width)
+
+    def render_century(self, year: int) -> InlineKeyboardMarkup:
+        """Creates an inline keyboard with ten decades ending with decade of specified year"""
+        return self._render_century(self._target(MARKUP_TARGET), year)
+
+    async def _get_century_kb(self, year: int):
+        """Async version of render_century"""
+        return self.render_century(year)
+
+    def _render_century(self, target, year: int):
+        layout = get_century_layout(year - year % 10, self._labels.cancel_caption, datetime.now().year)
+        return self._render_layout(target, layout, row_width=5)
+
+    def render_decade(self, year: int) -> InlineKeyboardMarkup:
+        """Creates an inline keyboard with years of decade of specified year"""
+        return self._render_decade(self._target(MARKUP_TARGET), year)
+
+    async def _get_decade_kb(self, year: int):
+        """Async version of render_decade"""
+        return self.render_decade(year)
+
+    def _render_decade(self, target, year: int):
+        layout = get_decade_layout(year - year % 10, self._labels.cancel_caption, datetime.now().year)
+        return self._render_layout(target, layout, row_width=5)
+
+    def render_months(self, year: int) -> InlineKeyboardMarkup:
         """Creates an inline keyboard with months for specified year"""
+        return self._render_months(self._target(MARKUP_TARGET), year)
+
+    async def _get_month_kb(self, year: int):
+        """Async version of render_months"""
+        return self.render_months(year)
 
+    def _render_months(self, target, year: int):
+        """Builds keyboard with months for specified year with render target"""
         today = datetime.now()
-        now_month, now_year = today.month, today.year
-        now_year = today.year
-
-        kb = []
-        # first row with year button
-        years_row = []
-        years_row.append(
-            InlineKeyboardButton(
-                text=self._labels.cancel_caption,
-                callback_data=DialogCalendarCallback(act=DialogCalAct.cancel, year=year, month=1, day=1).pack()
-            )
+        layout = get_months_layout(
+            year, self._labels.cancel_caption, self._labels.months, today.year, today.month
         )
-        years_row.append(InlineKeyboardButton(
-            text=str(year) if year != today.year else highlight(year),
-            callback_data=DialogCalendarCallback(act=DialogCalAct.start, year=year, month=-1, day=-1).pack()
-        ))
-        years_row.append(InlineKeyboardButton(text=" ", callback_data=self.ignore_callback))
-        kb.append(years_row)
-        # two rows with 6 months buttons
-        month6_row = []
-
-        def highlight_month():
-            month_str = self._labels.months[month - 1]
-            if now_month == month and now_year == year:
-                return highlight(month_str)
-            return month_str
-
-        for month in range(1, 7):
-            month6_row.append(InlineKeyboardButton(
-                text=highlight_month(),
-                callback_data=DialogCalendarCallback(
-                    act=DialogCalAct.set_m, year=year, month=month, day=-1
-                ).pack()
-            ))
-        month12_row = []
-
-        for month in range(7, 13):
-            month12_row.append(InlineKeyboardButton(
-                text=highlight_month(),
-                callback_data=DialogCalendarCallback(
-                    act=DialogCalAct.set_m, year=year, month=month, day=-1
-                ).pack()
-            ))
-
-        kb.append(month6_row)
-        kb.append(month12_row)
-        return InlineKeyboardMarkup(row_width=6, inline_keyboard=kb)
+        return self._render_layout(target, layout, row_width=6)
 
-    async def _get_days_kb(self, year: int, month: int):
+    def render_days(self, year: int, month: int) -> InlineKeyboardMarkup:
         """Creates an inline keyboard with calendar days of month for specified year and month"""
+        return self._render_days(self._target(MARKUP_TARGET), year, month)
 
-        today = datetime.now()
-        now_weekday = self._labels.days_of_week[today.weekday()]
-        now_month, now_year, now_day = today.month, today.year, today.day
-
-        def highlight_month():
-            month_str = self._labels.months[month - 1]
-            if now_month == month and now_year == year:
-                return highlight(month_str)
-            return month_str
-
-        def highlight_weekday():
-            if now_month == month and now_year == year and now_weekday == weekday:
-                return highlight(weekday)
-            return weekday
-
-        def format_day_string():
-            date_to_check = datetime(year, month, day)
-            if self.min_date and date_to_check < self.min_date:
-                return superscript(str(day))
-            elif self.max_date and date_to_check > self.max_date:
-                return superscript(str(day))
-            return str(day)
-
-        def highlight_day():
-            day_string = format_day_string()
-            if now_month == month and now_year == year and now_day == day:
-                return highlight(day_string)
-            return day_string
-
-        kb = []
-        nav_row = []
-        nav_row.append(
-            InlineKeyboardButton(
-                text=self._labels.cancel_caption,
-                callback_data=DialogCalendarCallback(act=DialogCalAct.cancel, year=year, month=1, day=1).pack()
-            )
+    async def _get_days_kb(self, year: int, month: int):
+        """Async version of render_days"""
+        return self.render_days(year, month)
+
+    def _render_days(self, target, year: int, month: int):
+        """Builds keyboard with days of month for specified year and month with render target"""
+        layout = get_days_layout(
+            year,
+            month,
+            self._labels.cancel_caption,
+            self._labels.months,
+            self._week_layout,
+            self.firstweekday,
+            self.min_date,
+            self.max_date,
+            datetime.now().date(),
         )
-        nav_row.append(InlineKeyboardButton(
-            text=str(year) if year != now_year else highlight(year),
-            callback_data=DialogCalendarCallback(act=DialogCalAct.start, year=year, month=-1, day=-1).pack()
-        ))
-        nav_row.append(InlineKeyboardButton(
-            text=highlight_month(),
-            callback_data=DialogCalendarCallback(act=DialogCalAct.set_y, year=year, month=-1, day=-1).pack()
-        ))
-        kb.append(nav_row)
-
-        week_days_labels_row = []
-        for weekday in self._labels.days_of_week:
-            week_days_labels_row.append(InlineKeyboardButton(
-                text=highlight_weekday(), callback_data=self.ignore_callback))
-        kb.append(week_days_labels_row)
-
-        month_calendar = calendar.monthcalendar(year, month)
-
-        for week in month_calendar:
-            days_row = []
-            for day in week:
-                if day == 0:
-                    days_row.append(InlineKeyboardButton(text=" ", callback_data=self.ignore_callback))
-                    continue
-                days_row.append(InlineKeyboardButton(
-                    text=highlight_day(),
-                    callback_data=DialogCalendarCallback(act=DialogCalAct.day, year=year, month=month, day=day).pack()
-                ))
-            kb.append(days_row)
-        return InlineKeyboardMarkup(row_width=7, inline_keyboard=kb)
+        return self._render_layout(target, layout, row_width=7)
 
     async def start_calendar(
         self,
         year: int = datetime.now().year,
         month: int = None
     ) -> InlineKeyboardMarkup:
-        today = datetime.now()
-        now_year = today.year
+        return self.render_calendar(year, month)
+
+    def _render_calendar(self, target, year: int = None, month: int = None):
+        """Builds keyboard of start_calendar with render target"""
+        now_year = datetime.now().year
+        year = year or now_year
 
         if month:
-            return await self._get_days_kb(year, month)
-        kb = []
-        # inline_kb = InlineKeyboardMarkup(row_width=5)
-        # first row - years
-        years_row = []
-        for value in range(year - 2, year + 3):
-            years_row.append(InlineKeyboardButton(
-                text=str(value) if value != now_year else highlight(value),
-                callback_data=DialogCalendarCallback(act=DialogCalAct.set_y, year=value, month=-1, day=-1).pack()
-            ))
-        kb.append(years_row)
-        # nav buttons
-        nav_row = []
-        nav_row.append(InlineKeyboardButton(
-            text='<<',
-            callback_data=DialogCalendarCallback(act=DialogCalAct.prev_y, year=year, month=-1, day=-1).pack()
-        ))
-        nav_row.append(InlineKeyboardButton(
-            text=self._labels.cancel_caption,
-            callback_data=DialogCalendarCallback(act=DialogCalAct.cancel, year=year, month=1, day=1).pack()
-        ))
-        nav_row.append(InlineKeyboardButton(
-            text='>>',
-            callback_data=DialogCalendarCallback(act=DialogCalAct.next_y, year=year, month=1, day=1).pack()
-        ))
-        kb.append(nav_row)
-        return InlineKeyboardMarkup(row_width=5, inline_keyboard=kb)
+            return self._render_days(target, year, month)
+        layout = get_years_layout(year, self._labels.cancel_caption, now_year)
+        return self._render_layout(target, layout, row_width=5)
 
     async def process_selection(self, query: CallbackQuery, data: DialogCalendarCallback) -> tuple:
         return_data = (False, None)
         if data.act == DialogCalAct.ignore:
             await query.answer(cache_time=60)
+            return return_data
+        # taps on keyboards rendered with previous epoch are answered without processing
+        if await self.process_stale(query, data):
+            return return_data
         if data.act == DialogCalAct.set_y:
             await query.message.edit_reply_markup(reply_markup=await self._get_month_kb(int(data.year)))
         if data.act == DialogCalAct.prev_y:
@@ -184,6 +296,10 @@ class DialogCalendar(GenericCalendar):
         if data.act == DialogCalAct.next_y:
             new_year = int(data.year) + 5
             await query.message.edit_reply_markup(reply_markup=await self.start_calendar(year=new_year))
+        if data.act == DialogCalAct.century:
+            await query.message.edit_reply_markup(reply_markup=await self._get_century_kb(int(data.year)))
+        if data.act == DialogCalAct.decade:
+            await query.message.edit_reply_markup(reply_markup=await self._get_decade_kb(int(data.year)))
         if data.act == DialogCalAct.start:
             await query.message.edit_reply_markup(reply_markup=await self.start_calendar(int(data.year)))
         if data.act == DialogCalAct.set_m:
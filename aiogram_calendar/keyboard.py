@@ -0,0 +1,90 @@
+import json
+
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+from .buttons import static_button, static_row
+
+
+class MarkupTarget:
+    "Render target building aiogram InlineKeyboardMarkup, static rows are taken from buttons pool"
+
+    @staticmethod
+    def button(text: str, callback_data: str) -> InlineKeyboardButton:
+        return InlineKeyboardButton(text=text, callback_data=callback_data)
+
+    @staticmethod
+    def static_button(text: str, callback_data: str) -> InlineKeyboardButton:
+        return static_button(text, callback_data)
+
+    @staticmethod
+    def row(buttons: tuple) -> list:
+        "Accepts tuple of (text, callback_data) pairs"
+        return list(static_row(buttons))
+
+    @staticmethod
+    def markup(kb: list, row_width: int) -> InlineKeyboardMarkup:
+        return InlineKeyboardMarkup(row_width=row_width, inline_keyboard=kb)
+
+
+class DictTarget:
+    """Render target building reply_markup as plain dicts of Bot API, no pydantic models are created.
+    Result can be dumped with json.dumps and sent with any HTTP client or as a webhook response
+    """
+
+    @staticmethod
+    def button(text: str, callback_data: str) -> dict:
+        return {"text": text, "callback_data": callback_data}
+
+    static_button = button
+
+    @staticmethod
+    def row(buttons: tuple) -> list:
+        "Accepts tuple of (text, callback_data) pairs"
+        return [{"text": text, "callback_data": callback_data} for text, callback_data in buttons]
+
+    @staticmethod
+    def markup(kb: list, row_width: int) -> dict:
+        return {"inline_keyboard": kb}
+
+
+EPOCH_FIELD = 6  # position of CalendarCallback.epoch in packed callback data: prefix, act, year, month, day, weekday
+
+
+def stamp_epoch(callback_data: str, epoch: int) -> str:
+    "Fills epoch of packed CalendarCallback, it is the last field of base class and is empty after packing"
+    parts = callback_data.split(":", EPOCH_FIELD + 1)
+    if len(parts) <= EPOCH_FIELD or parts[EPOCH_FIELD]:
+        return callback_data
+    parts[EPOCH_FIELD] = str(epoch)
+    return ":".join(parts)
+
+
+class EpochTarget:
+    "Render target stamping epoch into callback data of every button, wraps another render target"
+
+    __slots__ = ("target", "epoch")
+
+    def __init__(self, target, epoch: int):
+        self.target = target
+        self.epoch = epoch
+
+    def button(self, text: str, callback_data: str):
+        return self.target.button(text, stamp_epoch(callback_data, self.epoch))
+
+    def static_button(self, text: str, callback_data: str):
+        return self.target.static_button(text, stamp_epoch(callback_data, self.epoch))
+
+    def row(self, buttons: tuple) -> list:
+        return self.target.row(tuple((text, stamp_epoch(callback_data, self.epoch)) for text, callback_data in buttons))
+
+    def markup(self, kb: list, row_width: int):
+        return self.target.markup(kb, row_width)
+
+
+MARKUP_TARGET = MarkupTarget()
+DICT_TARGET = DictTarget()
+
+
+def dumps_markup(markup: dict) -> bytes:
+    "Serializes reply_markup dict to compact JSON"
+    return json.dumps(markup, ensure_ascii=False, separators=(",", ":")).encode()
@@ -1,15 +1,52 @@
 import calendar
-import logging
-from datetime import datetime, timedelta
+from copy import copy
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime
 
-from aiogram.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup
+from aiogram.types import CallbackQuery, InlineKeyboardMarkup
 
-from .common import GenericCalendar
+from . import day_labels
+from .buttons import PackedCallback, pack_callback
+from .common import GenericCalendar, get_month_days
 from .schemas import SELECT_DAY_FORMAT, MultipleCalendarCallback, SimpleCalAct
+from .selection import DateIntervalSet, RecurrenceRule, merge_dates
+from .session import SelectionSession
 
 
 class MultipleCalendar(GenericCalendar):
-    ignore_callback = MultipleCalendarCallback(act=SimpleCalAct.ignore).pack()  # placeholder for no answer buttons
+    __slots__ = ("range_mode", "selected_ranges", "recurring_weekdays", "weekday_rule")
+    callback_cls = MultipleCalendarCallback  # callback data of buttons, its prefix routes taps to calendar
+    # placeholder for no answer buttons, packed on first use
+    ignore_callback = PackedCallback(MultipleCalendarCallback, act=SimpleCalAct.ignore)
+    cache_renders = False  # keyboard depends on selection
+
+    def __init__(
+        self,
+        *args,
+        range_mode: bool = False,
+        selected_ranges=None,
+        recurring_weekdays: bool = False,
+        weekday_rule=None,
+        **kwargs,
+    ) -> None:
+        """Accepts all parameters of GenericCalendar and
+
+        Parameters:
+        range_mode (bool): user selects ranges of days by tapping first and last day instead of single days
+        selected_ranges (DateIntervalSet | str): selected ranges or their serialized form made by dumps
+        recurring_weekdays (bool): tapping day of week selects it in every week (weekday_rule) instead of
+            adding its dates of rendered month to selected days
+        weekday_rule (RecurrenceRule | str): selected recurrence of days of week or its serialized form
+        """
+        super().__init__(*args, **kwargs)
+        self.range_mode = range_mode
+        if not isinstance(selected_ranges, DateIntervalSet):
+            selected_ranges = DateIntervalSet.loads(selected_ranges)
+        self.selected_ranges = selected_ranges
+        self.recurring_weekdays = recurring_weekdays
+        if isinstance(weekday_rule, str):
+            weekday_rule = RecurrenceRule.loads(weekday_rule) if weekday_rule else None
+        self.weekday_rule = weekday_rule
 
     async def start_calendar(
         self,
@@ -17,6 +54,7 @@ class MultipleCalendar(GenericCalendar):
         month: int = datetime.now().month,
         day: int = datetime.now().day,
         with_next_button: bool = False,
+        range_start: date = None,
     ) -> InlineKeyboardMarkup:
         """
         Creates an inline keyboard with the provided year and month
@@ -25,101 +63,99 @@ class MultipleCalendar(GenericCalendar):
             year: year to start the calendar
             month: month to start the calendar
             day: day to start the calendar
+            range_start: first day of range picked by user in range mode, next tapped day closes the range
 
         Returns:
             InlineKeyboardMarkup: InlineKeyboardMarkup with the calendar
         """
+        return self.render_calendar(year, month, day, with_next_button, range_start)
+
+    def _render_calendar(
+        self,
+        target,
+        year: int = None,
+        month: int = None,
+        day: int = None,
+        with_next_button: bool = False,
+        range_start: date = None,
+    ):
+        """Builds keyboard of start_calendar with render target"""
 
         today = datetime.now()
         now_month, now_year, now_day = today.month, today.year, today.day
+        year = year or now_year
+        month = month or now_month
 
-        def select_day(picked_days):
-            selected_days = picked_days or []
-            date_obj = datetime.strptime(f"{day}.{month}.{year}", "%d.%m.%Y")
-
-            if date_obj.strftime("%d.%m.%y") in selected_days:
-                return f"{SELECT_DAY_FORMAT}"
-
-            return day
-
-        # building a calendar keyboard
+        # building a calendar keyboard, only day buttons are created, other rows are taken from buttons pool
         kb = []
 
-        first_row = [
-            InlineKeyboardButton(
-                text="Вы можете выбрать день недели или конкретную дату",
-                callback_data=self.ignore_callback,
-            )
-        ]
-        second_row = []
+        first_row = target.row((("Вы можете выбрать день недели или конкретную дату", self.ignore_callback),))
         if year == now_year and month == now_month:
-            second_row.append(InlineKeyboardButton(text=" ", callback_data=self.ignore_callback))
-
+            prev_button = (" ", self.ignore_callback)
         else:
-            second_row.append(
-                InlineKeyboardButton(
-                    text="<",
-                    callback_data=MultipleCalendarCallback(
-                        act=SimpleCalAct.prev_m, year=year, month=month, day=1
-                    ).pack(),
-                )
+            prev_button = (
+                "<", pack_callback(MultipleCalendarCallback, act=SimpleCalAct.prev_m, year=year, month=month, day=1)
             )
-
-        second_row.extend(
-            [
-                InlineKeyboardButton(text=self._labels.months[month - 1], callback_data=self.ignore_callback),
-                InlineKeyboardButton(
-                    text=">",
-                    callback_data=MultipleCalendarCallback(
-                        act=SimpleCalAct.next_m, year=year, month=month, day=1
-                    ).pack(),
-                ),
-            ]
-        )
+        second_row = target.row((
+            prev_button,
+            (self._labels.months[month - 1], self.ignore_callback),
+            (">", pack_callback(MultipleCalendarCallback, act=SimpleCalAct.next_m, year=year, month=month, day=1)),
+        ))
 
         kb.append(first_row)
         kb.append(second_row)
 
         # Week Days
-        week_days_labels_row = []
-        selected_weekdays = self._get_selected_weekdays()
-        for weekday in self._labels.days_of_week:
-            week_days_labels_row.append(
-                InlineKeyboardButton(
-                    text=str(weekday),
-                    callback_data=MultipleCalendarCallback(
-                        act=(
-                            SimpleCalAct.unselect_weekdays
-                            if weekday.lower() in selected_weekdays
-                            else SimpleCalAct.select_weekdays
-                        ),
-                        month=month,
-                        year=year,
-                        weekday=weekday,
-                    ).pack(),
-                )
+        if self.recurring_weekdays:
+            selected_weekdays = self.weekday_rule.weekdays if self.weekday_rule else frozenset()
+        else:
+            selected_weekdays = self._get_selected_weekdays()
+        week_days_labels_row = target.row(tuple(
+            (
+                str(weekday_label),
+                pack_callback(
+                    MultipleCalendarCallback,
+                    act=(
+                        SimpleCalAct.unselect_weekdays if weekday in selected_weekdays else SimpleCalAct.select_weekdays
+                    ),
+                    month=month,
+                    year=year,
+                    weekday=weekday,
+                ),
             )
+            for weekday, weekday_label in self._week_layout
+        ))
         kb.append(week_days_labels_row)
 
         # Calendar rows - Days of month
-        month_calendar = calendar.monthcalendar(year, month)
+        month_calendar = get_month_days(year, month, self.firstweekday)
+        # days of weekday rule are expanded for rendered month only, they are switched by days of week buttons
+        rule_days = self.weekday_rule.month_days(year, month) if self.weekday_rule else frozenset()
+        selected_days = set(self.selected_days)
+        month_suffix = f".{month:02d}.{year % 100:02d}"  # selected days are stored in format dd.mm.yy
+        empty_button = target.static_button(" ", self.ignore_callback)
+        rule_day_button = target.static_button(SELECT_DAY_FORMAT, self.ignore_callback)
         for week in month_calendar:
             days_row = []
             for day in week:
                 if day == 0 or (month == now_month and year == now_year and day < now_day):
-                    days_row.append(InlineKeyboardButton(text=" ", callback_data=self.ignore_callback))
+                    days_row.append(empty_button)
                     continue
 
-                date_obj = datetime.strptime(f"{day}.{month}.{year}", "%d.%m.%Y")
+                if day in rule_days:
+                    days_row.append(rule_day_button)
+                    continue
+
+                if self.range_mode:
+                    days_row.append(self._get_range_day_button(target, date(year, month, day), range_start))
+                    continue
+
+                is_selected = f"{day:02d}{month_suffix}" in selected_days
                 days_row.append(
-                    InlineKeyboardButton(
-                        text=str(select_day(self.selected_days)),
-                        callback_data=MultipleCalendarCallback(
-                            act=(
-                                SimpleCalAct.unselect_day
-                                if date_obj.strftime("%d.%m.%y") in self.selected_days
-                                else SimpleCalAct.day
-                            ),
+                    target.button(
+                        day_labels.day_label(day, day_labels.SELECTED if is_selected else day_labels.PLAIN),
+                        MultipleCalendarCallback(
+                            act=SimpleCalAct.unselect_day if is_selected else SimpleCalAct.day,
                             year=year,
                             month=month,
                             day=day,
@@ -128,31 +164,63 @@ class MultipleCalendar(GenericCalendar):
                 )
             kb.append(days_row)
 
-        cancel_row = [
-            InlineKeyboardButton(
-                text=self._labels.back_caption,
-                callback_data=MultipleCalendarCallback(act=SimpleCalAct.cancel).pack(),
-            ),
-        ]
+        cancel_row = (
+            (self._labels.back_caption, pack_callback(MultipleCalendarCallback, act=SimpleCalAct.cancel)),
+        )
         if with_next_button:
-            cancel_row.extend(
-                [
-                    InlineKeyboardButton(text=" ", callback_data=self.ignore_callback),
-                    InlineKeyboardButton(
-                        text=self._labels.save_caption,
-                        callback_data=MultipleCalendarCallback(act=SimpleCalAct.save_days).pack(),
-                    ),
-                ]
+            cancel_row += (
+                (" ", self.ignore_callback),
+                (self._labels.save_caption, pack_callback(MultipleCalendarCallback, act=SimpleCalAct.save_days)),
             )
-        kb.append(cancel_row)
-
-        return InlineKeyboardMarkup(row_width=7, inline_keyboard=kb)
+        kb.append(target.row(cancel_row))
+
+        return target.markup(kb, row_width=7)
+
+    def _get_range_day_button(self, target, day: date, range_start: date = None):
+        """Creates day button for range mode, selected days are found with binary search in selected ranges"""
+        style = day_labels.PLAIN
+        if day in self.selected_ranges or day.strftime("%d.%m.%y") in self.selected_days:
+            style |= day_labels.SELECTED
+        if range_start:
+            if day == range_start:
+                style |= day_labels.HIGHLIGHTED
+            callback_data = MultipleCalendarCallback(
+                act=SimpleCalAct.range_end, year=day.year, month=day.month, day=day.day,
+                range_start=range_start.toordinal(),
+            )
+        else:
+            callback_data = MultipleCalendarCallback(
+                act=SimpleCalAct.range_start, year=day.year, month=day.month, day=day.day
+            )
+        return target.button(day_labels.day_label(day.day, style), callback_data.pack())
 
-    async def process_weekdays_select(self, data, query) -> str:
-        dates = self._get_weekday_dates(data.year, data.month, data.weekday)
+    def iter_selected_days(self, start=None, until=None):
+        """
+        Lazily yields all selected days, including days of selected ranges and weekday rule, as date objects in order.
+        Ranges and rule are expanded on the fly, so iteration over long ranges takes constant memory.
+        Iteration is endless if until is not set and weekday rule has neither until nor count.
+        Args:
+            start: first date to yield, if None - from the earliest selected day
+            until: last date to yield (inclusive), if None - up to the latest selected day
+        """
+        # selected_days list is unordered, so its dates have to be sorted before merging
+        days = sorted(datetime.strptime(day_string, "%d.%m.%y").date() for day_string in self.selected_days)
+        if start is not None:
+            start = start.date() if isinstance(start, datetime) else start
+            days = days[bisect_left(days, start):]
+        if until is not None:
+            until = until.date() if isinstance(until, datetime) else until
+            days = days[:bisect_right(days, until)]
+        rule_dates = self.weekday_rule.iter_dates(start, until) if self.weekday_rule else ()
+        return merge_dates(days, self.selected_ranges.iter_dates(start, until), rule_dates)
+
+    async def process_weekdays_select(self, data, query, unselect: bool = False) -> str:
+        dates = self._get_weekday_dates(data.year, data.month, data.weekday, unselect)
         return ",".join(dates)
 
-    async def process_selection(self, query: CallbackQuery, data: MultipleCalendarCallback) -> tuple:
+    async def process_selection(
+        self, query: CallbackQuery, data: MultipleCalendarCallback, session: SelectionSession = None
+    ) -> tuple:
         """
         Process the callback_query. This method generates a new calendar if forward or
         backward is pressed. This method should be called inside a CallbackQueryHandler.
@@ -160,32 +228,75 @@ class MultipleCalendar(GenericCalendar):
         :param data: callback_data, dictionary, set by calendar_callback
         :return: Returns a tuple (Boolean,datetime), indicating if a date is selected
                     and returning the date if so.
+
+        In range mode first tap returns (False, "start:dd.mm.yy") - render calendar with this range_start
+        (also when navigating to other months), second tap returns (True, "add:<ranges>") or
+        (True, "remove:<ranges>") if whole range was selected already, where ranges are DateIntervalSet.dumps()
+
+        With recurring_weekdays days of week buttons return (True, "rule:<rule>") with RecurrenceRule.dumps()
+        of updated weekday rule, it replaces the previous one
+
+        With session selection is read from and changed in session instead of calendar, taps of the same
+        session are processed one at a time and every change is recorded in session as a versioned delta
         """
+        if session is None:
+            return await self._process_selection(query, data)
+
+        async with session.lock:
+            calendar = self.for_session(session)
+            selected, result = await calendar._process_selection(query, data)
+            session.weekday_rule = calendar.weekday_rule
+            if selected:
+                session.record(result)
+        return selected, result
+
+    def for_session(self, session: SelectionSession) -> "MultipleCalendar":
+        """Returns copy of calendar working on selection of session, e.g. to render it,
+        so calendar itself can be shared by handlers
+        """
+        calendar = copy(self)
+        calendar.selected_days = session.selected_days
+        calendar.selected_ranges = session.selected_ranges
+        calendar.weekday_rule = session.weekday_rule
+        return calendar
+
+    async def _process_selection(self, query: CallbackQuery, data: MultipleCalendarCallback) -> tuple:
         return_data = (False, None)
-        logging.fatal("ON BOT")
-        logging.fatal(data)
-        logging.fatal(data.act)
 
         if data.act == SimpleCalAct.ignore:
             await query.answer(cache_time=60)
             return return_data
 
-        if data.act == SimpleCalAct.day:
-            day = await self.process_day_select(data, query)
-            return True, f"add:{day}"
+        # taps on keyboards rendered with previous epoch are answered without processing
+        if await self.process_stale(query, data):
+            return return_data
 
-        if data.act == SimpleCalAct.unselect_day:
+        if data.act in (SimpleCalAct.day, SimpleCalAct.unselect_day):
             day = await self.process_day_select(data, query)
-            return True, f"remove:{day}"
+            if day is None:
+                return return_data
+            return True, f"{'add' if data.act == SimpleCalAct.day else 'remove'}:{day}"
+
+        if self.recurring_weekdays and data.act in (SimpleCalAct.select_weekdays, SimpleCalAct.unselect_weekdays):
+            return await self.process_weekday_rule_select(data, query)
 
         if data.act == SimpleCalAct.select_weekdays:
             dates = await self.process_weekdays_select(data, query)
             return True, f"add:{dates}"
 
         if data.act == SimpleCalAct.unselect_weekdays:
-            dates = await self.process_weekdays_select(data, query)
+            dates = await self.process_weekdays_select(data, query, unselect=True)
             return True, f"remove:{dates}"
 
+        if data.act == SimpleCalAct.range_start:
+            date = datetime(int(data.year), int(data.month), int(data.day))
+            if not await self._check_date(date, query):
+                return return_data
+            return False, f"start:{date.strftime('%d.%m.%y')}"
+
+        if data.act == SimpleCalAct.range_end:
+            return await self.process_range_select(data, query)
+
         if data.act == SimpleCalAct.prev_m:
             return False, SimpleCalAct.prev_m
 
@@ -194,83 +305,119 @@ class MultipleCalendar(GenericCalendar):
 
         return return_data
 
-    async def process_day_select(self, data, query):
-        """Checks selected date is in allowed range of dates"""
-        date = datetime(int(data.year), int(data.month), int(data.day))
+    async def process_weekday_rule_select(self, data, query) -> tuple:
+        """Switches tapped day of week in weekday rule, new rule starts today and lasts until max date if set"""
+        rule = self.weekday_rule
+        if rule is None:
+            start = datetime.now().date()
+            if self.min_date and self.min_date.date() > start:
+                start = self.min_date.date()
+            rule = RecurrenceRule((), start=start, until=self.max_date)
+
+        if data.act == SimpleCalAct.select_weekdays:
+            weekdays = rule.weekdays | {int(data.weekday)}
+        else:
+            weekdays = rule.weekdays - {int(data.weekday)}
+        self.weekday_rule = rule.replace(weekdays=weekdays)
+
+        return True, f"rule:{self.weekday_rule.dumps()}"
+
+    async def process_range_select(self, data, query) -> tuple:
+        """Closes range started at data.range_start with the tapped day and toggles it in selected ranges"""
+        start = datetime.fromordinal(int(data.range_start))
+        end = datetime(int(data.year), int(data.month), int(data.day))
+        if end < start:
+            start, end = end, start
+
+        if not await self._check_date(start, query) or not await self._check_date(end, query):
+            return False, None
+
+        picked = DateIntervalSet([(start, end)])
+        if self.selected_ranges.contains_range(start, end):
+            self.selected_ranges.difference_update(picked)
+            return True, f"remove:{picked.dumps()}"
+
+        self.selected_ranges.update(picked)
+        return True, f"add:{picked.dumps()}"
 
+    async def _check_date(self, date: datetime, query) -> bool:
+        """Checks date is in allowed range of dates, answers query with error otherwise"""
         if self.min_date and self.min_date > date:
             await query.answer(
                 f'The date have to be later {self.min_date.strftime("%d.%m.%y")}', show_alert=self.show_alerts
             )
-            return False, None
+            return False
 
         if self.max_date and self.max_date < date:
             await query.answer(
                 f'The date have to be before {self.max_date.strftime("%d.%m.%y")}', show_alert=self.show_alerts
             )
-            return False, None
-
-        date_string: str = date.strftime("%d.%m.%y")
-
-        self.selected_days.append(date_string)
+            return False
 
-        return date.strftime(date_string)
+        return True
 
-    def _get_weekday_dates(self, year, month, weekday):
-        weekday_map = {
-            "пн": 0,
-            "вт": 1,
-            "ср": 2,
-            "чт": 3,
-            "пт": 4,
-            "сб": 5,
-            "вс": 6,
-        }
-        weekday = weekday_map[weekday.lower()]
+    async def process_day_select(self, data, query):
+        """Checks tapped date is in allowed range of dates and adds it to selected days, or removes it
+        for unselect_day, returns date in format dd.mm.yy or None if date is not allowed
+        """
+        date = datetime(int(data.year), int(data.month), int(data.day))
 
-        first_day = datetime(year, month, 1)
+        if not await self._check_date(date, query):
+            return None
 
-        days_ahead = weekday - first_day.weekday()
-        if days_ahead < 0:
-            days_ahead += 7
+        date_string: str = date.strftime("%d.%m.%y")
 
-        first_occurrence = first_day + timedelta(days=days_ahead)
+        if data.act == SimpleCalAct.unselect_day:
+            while date_string in self.selected_days:
+                self.selected_days.remove(date_string)
+        elif date_string not in self.selected_days:
+            self.selected_days.append(date_string)
 
-        # Get all occurrences
-        dates = []
-        current_date = first_occurrence
+        return date_string
 
-        while current_date.month == month:
-            if current_date.date() >= datetime.now().date():
-                current_date_string: str = current_date.strftime("%d.%m.%y")
-                dates.append(current_date_string)
+    def _get_weekday_dates(self, year, month, weekday, unselect: bool = False):
+        """
+        Collects not past dates of month falling on weekday and adds them to selected days,
+        or removes them if unselect is True.
 
-                self.selected_days.append(current_date_string)
+        Args:
+            year: year of month
+            month: month to collect dates in
+            weekday: day of week, 0 is Monday and 6 is Sunday
 
-            current_date += timedelta(days=7)
+        Returns:
+            list: dates in format dd.mm.yy
+        """
+        today = datetime.now()
+        if (year, month) < (today.year, today.month):
+            return []
+
+        first_weekday, days_in_month = calendar.monthrange(year, month)
+        first_day = (int(weekday) - first_weekday) % 7 + 1
+        if (year, month) == (today.year, today.month) and first_day < today.day:
+            # skipping weeks that already passed
+            first_day += (today.day - first_day + 6) // 7 * 7
+
+        month_suffix = f".{month:02d}.{year % 100:02d}"
+        dates = [f"{day:02d}{month_suffix}" for day in range(first_day, days_in_month + 1, 7)]
+        if unselect:
+            self.selected_days[:] = [day for day in self.selected_days if day not in dates]
+        else:
+            self.selected_days.extend(day for day in dates if day not in self.selected_days)
 
         return dates
 
     def _get_selected_weekdays(self):
         """
-        Convert a date to its weekday name.
-
-        Args:
-            date_input: Can be either:
-                - string in format 'YYYY-MM-DD' or 'DD.MM.YYYY'
-                - list/tuple of integers [day, month, year]
-                - datetime object
+        Collects days of week of selected days.
 
         Returns:
-            str: Abbreviated weekday name in specified language
+            set: weekdays of selected days, 0 is Monday and 6 is Sunday independently of first day of week
         """
-        weekday_map_ru = {0: "пн", 1: "вт", 2: "ср", 3: "чт", 4: "пт", 5: "сб", 6: "вс"}
         selected_weekdays = set()
 
-        for date in self.selected_days:
-            date_obj = datetime.strptime(date, "%d.%m.%y")
-            weekday = date_obj.weekday()
-            day = weekday_map_ru[weekday]
-            selected_weekdays.add(day)
+        for date_string in self.selected_days:
+            date_obj = datetime.strptime(date_string, "%d.%m.%y")
+            selected_weekdays.add(date_obj.weekday())
 
         return selected_weekdays
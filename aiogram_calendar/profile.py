@@ -0,0 +1,223 @@
+"""Profiles calendars on representative workloads offline, Telegram is replaced with a fake bot
+
+Run: python -m aiogram_calendar.profile [workload ...] [--repeat N] [--top N] [--output stats.prof]
+Workloads are run three times: with timing of key functions, under cProfile and under tracemalloc,
+so measurements of one pass are not distorted by the others. Output can be attached to bug reports as is.
+"""
+import argparse
+import asyncio
+import cProfile
+import io
+import pstats
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from aiogram.filters.callback_data import CallbackData
+
+from . import common
+from .datetime_calendar import DateTimeCalendar
+from .dialog_calendar import DialogCalendar
+from .multiple_calendar import MultipleCalendar
+from .schemas import DialogCalAct, DialogCalendarCallback, MultipleCalendarCallback, SimpleCalAct, \
+    SimpleCalendarCallback
+from .simple_calendar import SimpleCalendar
+
+
+YEAR = 2030  # all months of the year are in the future, so no days are hidden as past ones
+
+
+class FakeBot:
+    "Counts Bot API requests calendars make through fake queries"
+
+    def __init__(self):
+        self.requests = Counter()
+
+    def query(self) -> "FakeQuery":
+        return FakeQuery(self)
+
+
+class FakeMessage:
+    def __init__(self, bot: FakeBot):
+        self.bot = bot
+
+    async def edit_reply_markup(self, reply_markup=None, **kwargs):
+        self.bot.requests["editMessageReplyMarkup"] += 1
+
+    async def edit_text(self, text: str, **kwargs):
+        self.bot.requests["editMessageText"] += 1
+
+    async def delete_reply_markup(self, **kwargs):
+        self.bot.requests["editMessageReplyMarkup"] += 1
+
+    async def answer(self, text: str, **kwargs):
+        self.bot.requests["sendMessage"] += 1
+
+
+class FakeQuery:
+    def __init__(self, bot: FakeBot):
+        self.message = FakeMessage(bot)
+        self._bot = bot
+
+    async def answer(self, text: str = None, **kwargs):
+        self._bot.requests["answerCallbackQuery"] += 1
+
+
+async def render_storm(bot: FakeBot, repeat: int):
+    "Every calendar renders every month of a year"
+    calendars = (
+        SimpleCalendar(), SimpleCalendar(months_shown=3), DialogCalendar(), MultipleCalendar(), DateTimeCalendar()
+    )
+    for _ in range(repeat):
+        for calendar in calendars:
+            for month in range(1, 13):
+                await calendar.start_calendar(year=YEAR, month=month)
+
+
+async def navigation(bot: FakeBot, repeat: int):
+    "User leafs a year forward in SimpleCalendar and zooms from century to a day in DialogCalendar"
+    simple, dialog = SimpleCalendar(), DialogCalendar()
+    for _ in range(repeat):
+        for month in range(1, 13):
+            data = SimpleCalendarCallback(act=SimpleCalAct.next_m, year=YEAR, month=month, day=1)
+            await simple.process_selection(bot.query(), data)
+        for act, year, month, day in (
+            (DialogCalAct.century, 1987, -1, -1),
+            (DialogCalAct.decade, 1980, -1, -1),
+            (DialogCalAct.set_y, 1987, -1, -1),
+            (DialogCalAct.set_m, 1987, 3, -1),
+            (DialogCalAct.day, 1987, 3, 14),
+        ):
+            data = DialogCalendarCallback(act=act, year=year, month=month, day=day)
+            await dialog.process_selection(bot.query(), data)
+
+
+async def weekday_selection(bot: FakeBot, repeat: int):
+    "User selects every day of week in every month of a year in MultipleCalendar, keyboard is rendered after taps"
+    for _ in range(repeat):
+        calendar = MultipleCalendar()
+        for month in range(1, 13):
+            for weekday in range(7):
+                data = MultipleCalendarCallback(
+                    act=SimpleCalAct.select_weekdays, year=YEAR, month=month, weekday=weekday
+                )
+                await calendar.process_selection(bot.query(), data)
+                await calendar.start_calendar(year=YEAR, month=month)
+
+
+WORKLOADS = {
+    "render": render_storm,
+    "navigation": navigation,
+    "weekdays": weekday_selection,
+}
+
+
+def run_workloads(names, repeat: int) -> FakeBot:
+    bot = FakeBot()
+    loop = asyncio.new_event_loop()
+    try:
+        for name in names:
+            loop.run_until_complete(WORKLOADS[name](bot, repeat))
+    finally:
+        loop.close()
+    return bot
+
+
+def timed(func, timings: dict, name: str):
+    "Wraps function to add its calls and time to timings[name]"
+    if iscoroutinefunction(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                timings[name][0] += 1
+                timings[name][1] += time.perf_counter() - start
+    else:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timings[name][0] += 1
+                timings[name][1] += time.perf_counter() - start
+    return wrapper
+
+
+@contextmanager
+def timing(timings: dict):
+    "Times key functions of calendars while inside the context"
+    calendars = (SimpleCalendar, DialogCalendar, MultipleCalendar, DateTimeCalendar)
+    targets = [(cls, method) for method in ("start_calendar", "process_selection") for cls in calendars
+               if method in vars(cls)]
+    targets += [(CallbackData, "pack"), (common, "get_labels"), (common, "get_locale_labels")]
+    originals = [(owner, attribute, getattr(owner, attribute)) for owner, attribute in targets]
+    for owner, attribute, func in originals:
+        name = f"{owner.__name__.rpartition('.')[2]}.{attribute}"
+        timings.setdefault(name, [0, 0.0])
+        setattr(owner, attribute, timed(func, timings, name))
+    try:
+        yield
+    finally:
+        for owner, attribute, func in originals:
+            setattr(owner, attribute, func)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m aiogram_calendar.profile", description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "workloads", nargs="*", metavar="workload", help=f"any of {', '.join(WORKLOADS)}, all by default"
+    )
+    parser.add_argument("--repeat", type=int, default=20, help="runs of every workload in every pass")
+    parser.add_argument("--top", type=int, default=20, help="lines of cProfile and tracemalloc reports")
+    parser.add_argument("--sort", default="cumulative", help="sort key of cProfile report")
+    parser.add_argument("--output", help="file to dump cProfile stats to, e.g. for snakeviz")
+    args = parser.parse_args(argv)
+    workloads = args.workloads or list(WORKLOADS)
+    unknown = set(workloads) - set(WORKLOADS)
+    if unknown:
+        parser.error(f"unknown workloads: {', '.join(sorted(unknown))}")
+
+    # warming up caches of labels, layouts and buttons the same way as in a running bot
+    run_workloads(workloads, 1)
+
+    print(f"Python {sys.version.split()[0]}, workloads: {', '.join(workloads)}, repeat: {args.repeat}\n")
+
+    timings = {}
+    start = time.perf_counter()
+    with timing(timings):
+        bot = run_workloads(workloads, args.repeat)
+    print(f"Wall time with timing: {(time.perf_counter() - start) * 1e3:.1f} ms")
+    print("Fake Bot API requests: " + ", ".join(f"{method} {count}" for method, count in sorted(bot.requests.items())))
+    print(f"\n{'function':<40} {'calls':>8} {'total ms':>10} {'per call us':>12}")
+    for name, (calls, seconds) in timings.items():
+        per_call = seconds / calls * 1e6 if calls else 0
+        print(f"{name:<40} {calls:>8} {seconds * 1e3:>10.1f} {per_call:>12.1f}")
+
+    profiler = cProfile.Profile()
+    profiler.runcall(run_workloads, workloads, args.repeat)
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.sort_stats(args.sort).print_stats(args.top)
+    print(f"\ncProfile, top {args.top} by {args.sort}:{stream.getvalue()}")
+    if args.output:
+        stats.dump_stats(args.output)
+
+    tracemalloc.start()
+    run_workloads(workloads, args.repeat)
+    snapshot = tracemalloc.take_snapshot()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"tracemalloc, current {current / 1024:.1f} KiB, peak {peak / 1024:.1f} KiB, top {args.top} allocations:")
+    for statistic in snapshot.statistics("lineno")[:args.top]:
+        print(statistic)
+
+
+if __name__ == "__main__":
+    main()
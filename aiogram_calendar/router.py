@@ -0,0 +1,128 @@
+"""Ready-made router handling taps of calendars, e.g.
+
+    router = create_calendar_router(
+        (SimpleCalendar(), on_date_selected),
+        (DialogCalendar(), on_date_selected),
+    )
+    dp.include_router(router)
+"""
+from datetime import date
+from typing import Awaitable, Callable, Optional
+
+from aiogram import Router
+from aiogram.types import CallbackQuery
+
+from .common import shift_month
+from .multiple_calendar import MultipleCalendar
+from .schemas import MultipleCalendarCallback, SimpleCalAct
+from .session import SelectionSessions
+
+
+CompletionHook = Callable[[CallbackQuery, object], Awaitable]  # awaited with query and selected result
+
+
+class CalendarDispatch:
+    """Filter finding calendar of callback query by prefix of its data, so a tap is dispatched by one dict lookup
+    and unpacked once however many calendars are registered, instead of unpacking by a filter of every handler
+    """
+
+    __slots__ = ("routes",)
+
+    def __init__(self):
+        self.routes = {}
+
+    def add(self, calendar, on_complete: Optional[CompletionHook] = None):
+        prefix = calendar.callback_cls.__prefix__
+        if prefix in self.routes:
+            raise ValueError(f"Calendar with prefix {prefix!r} is added already, one calendar per class is routed")
+        self.routes[prefix] = (calendar, on_complete)
+
+    def __call__(self, query: CallbackQuery):
+        data = query.data or ""
+        route = self.routes.get(data.partition(":")[0])
+        if route is None:
+            return False
+        calendar, on_complete = route
+        try:
+            callback_data = calendar.callback_cls.unpack(data)
+        except (TypeError, ValueError):
+            # keyboards rendered by releases with other fields of callback data are handled as stale
+            callback_data = None
+        return {"calendar": calendar, "callback_data": callback_data, "on_complete": on_complete}
+
+
+def create_calendar_router(*calendars, sessions: SelectionSessions = None, name: str = None) -> Router:
+    """Creates router processing taps of calendars and awaiting completion hooks with selected results
+
+    Args:
+        calendars: calendars or (calendar, on_complete) pairs, on_complete is awaited with callback query
+            and result of process_selection when selection is made. Calendars are shared by all chats,
+            so they have to be created with settings common to all users
+        sessions: selections of MultipleCalendar messages, every message gets its own session
+            starting with selection of calendar, new SelectionSessions if None
+
+    MultipleCalendar keyboard is re-rendered by router after every tap with save button, so start it with
+    with_next_button=True. Its on_complete is awaited on save with SelectionSession.snapshot() of message,
+    session is dropped then.
+    """
+    dispatch = CalendarDispatch()
+    for calendar in calendars:
+        calendar, on_complete = calendar if isinstance(calendar, tuple) else (calendar, None)
+        dispatch.add(calendar, on_complete)
+    sessions = SelectionSessions() if sessions is None else sessions
+
+    async def process_multiple(
+        query: CallbackQuery, calendar: MultipleCalendar, data: MultipleCalendarCallback, on_complete
+    ):
+        key = sessions.get_key(query)
+        session = sessions.get(
+            key,
+            selected_days=calendar.selected_days,
+            selected_ranges=calendar.selected_ranges,
+            weekday_rule=calendar.weekday_rule,
+        )
+        if data.act in (SimpleCalAct.save_days, SimpleCalAct.cancel):
+            # taps of the message being processed are finished before selection is taken
+            async with session.lock:
+                if await calendar.process_stale(query, data):
+                    return
+                sessions.pop(key)
+                snapshot = session.snapshot()
+            await query.message.delete_reply_markup()
+            await query.answer()
+            if data.act == SimpleCalAct.save_days and on_complete is not None:
+                await on_complete(query, snapshot)
+            return
+
+        selected, result = await calendar.process_selection(query, data, session)
+        if not selected and result is None:
+            return  # tap is answered by calendar: ignored, stale or date is out of allowed range
+        year, month = int(data.year), int(data.month)
+        if result == SimpleCalAct.prev_m:
+            year, month = shift_month(year, month, -1)
+        elif result == SimpleCalAct.next_m:
+            year, month = shift_month(year, month, 1)
+        elif result.startswith("start:"):
+            session.range_start = date(year, month, int(data.day))
+        elif data.act == SimpleCalAct.range_end:
+            session.range_start = None
+        markup = calendar.for_session(session).render_calendar(
+            year, month, with_next_button=True, range_start=session.range_start
+        )
+        await query.message.edit_reply_markup(reply_markup=markup)
+        await query.answer()
+
+    async def process_calendar(query: CallbackQuery, calendar, callback_data, on_complete):
+        if callback_data is None:
+            await calendar.process_stale(query, None)
+            return
+        if isinstance(calendar, MultipleCalendar):
+            await process_multiple(query, calendar, callback_data, on_complete)
+            return
+        selected, result = await calendar.process_selection(query, callback_data)
+        if selected and on_complete is not None:
+            await on_complete(query, result)
+
+    router = Router(name=name)
+    router.callback_query.register(process_calendar, dispatch)
+    return router
@@ -1,4 +1,5 @@
-from typing import Optional
+from functools import lru_cache
+from typing import NamedTuple, Optional
 from enum import Enum
 
 from pydantic import BaseModel, conlist, Field
@@ -12,6 +13,8 @@ class SimpleCalAct(str, Enum):
     unselect_weekdays = "UNSELECT_ALL_WEEKDAYS"
     unselect_day = "UNSELECT_DAY"
     save_days = "SAVE_DAYS"
+    range_start = "RANGE_START"
+    range_end = "RANGE_END"
     prev_y = "PREV-YEAR"
     next_y = "NEXT-YEAR"
     prev_m = "PREV-MONTH"
@@ -30,6 +33,22 @@ class DialogCalAct(str, Enum):
     cancel = "CANCEL"
     start = "START"
     day = "SET-DAY"
+    century = "CENTURY"
+    decade = "DECADE"
+
+
+class DateTimeCalAct(str, Enum):
+    ignore = "IGNORE"
+    prev_y = "PREV-YEAR"
+    next_y = "NEXT-YEAR"
+    prev_m = "PREV-MONTH"
+    next_m = "NEXT-MONTH"
+    cancel = "CANCEL"
+    today = "TODAY"
+    day = "DAY"
+    hour = "HOUR"
+    time = "TIME"
+    back = "BACK"
 
 
 class CalendarCallback(CallbackData, prefix="calendar"):
@@ -37,7 +56,10 @@ class CalendarCallback(CallbackData, prefix="calendar"):
     year: Optional[int] = None
     month: Optional[int] = None
     day: Optional[int] = None
-    weekday: Optional[str] = None
+    weekday: Optional[int] = None  # day of week, 0 is Monday and 6 is Sunday
+    # epoch of calendar keyboard was rendered with, it has to stay the last field of base class: it is filled
+    # in packed callback data by keyboard.EpochTarget, fields of subclasses follow it
+    epoch: Optional[int] = None
 
 
 class SimpleCalendarCallback(CalendarCallback, prefix="simple_calendar"):
@@ -46,12 +68,18 @@ class SimpleCalendarCallback(CalendarCallback, prefix="simple_calendar"):
 
 class MultipleCalendarCallback(CalendarCallback, prefix="multiple_calendar"):
     act: SimpleCalAct
+    range_start: Optional[int] = None  # ordinal of first day of range being selected
 
 
 class DialogCalendarCallback(CalendarCallback, prefix="dialog_calendar"):
     act: DialogCalAct
 
 
+class DateTimeCalendarCallback(CalendarCallback, prefix="datetime_calendar"):
+    act: DateTimeCalAct
+    minute: Optional[int] = None  # time of day as minutes since midnight
+
+
 class CalendarLabels(BaseModel):
     "Schema to pass labels for calendar. Can be used to put in different languages"
     days_of_week: conlist(str, max_length=7, min_length=7) = ["mo", "tu", "we", "th", "fr", "sa", "su"]
@@ -75,6 +103,49 @@ class CalendarLabels(BaseModel):
     save_caption: str = Field(default="Сохранить", description="Сохраняет выбранные даты")
 
 
+class Labels(NamedTuple):
+    """Immutable labels of calendar, same labels are interned by get_labels and shared by all calendars.
+    Use CalendarLabels to pass labels to calendar, or get_labels to make labels without pydantic validation
+    """
+    days_of_week: tuple
+    months: tuple
+    cancel_caption: str
+    back_caption: str
+    today_caption: str
+    save_caption: str
+
+    @classmethod
+    def from_model(cls, labels: CalendarLabels) -> "Labels":
+        return get_labels(
+            tuple(labels.days_of_week),
+            tuple(labels.months),
+            labels.cancel_caption,
+            labels.back_caption,
+            labels.today_caption,
+            labels.save_caption,
+        )
+
+
+@lru_cache(maxsize=256)
+def get_labels(
+    days_of_week: tuple,
+    months: tuple,
+    cancel_caption: str,
+    back_caption: str,
+    today_caption: str,
+    save_caption: str,
+) -> Labels:
+    "Returns interned labels, amount of days of week and months is checked once per distinct labels"
+    if len(days_of_week) != 7:
+        raise ValueError("There have to be 7 days of week")
+    if len(months) != 12:
+        raise ValueError("There have to be 12 months")
+    return Labels(tuple(days_of_week), tuple(months), cancel_caption, back_caption, today_caption, save_caption)
+
+
+DEFAULT_LABELS = Labels.from_model(CalendarLabels())
+
+
 HIGHLIGHT_FORMAT = "[{}]"
 SELECT_DAY_FORMAT = "✅"
 
@@ -87,19 +158,19 @@ def select(text):
     return SELECT_DAY_FORMAT.format(text)
 
 
+SUPERSCRIPT_TABLE = str.maketrans(
+    "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+-=()",
+    "ᴬᴮᶜᴰᴱᶠᴳᴴᴵᴶᴷᴸᴹᴺᴼᴾQᴿˢᵀᵁⱽᵂˣʸᶻᵃᵇᶜᵈᵉᶠᵍʰᶦʲᵏˡᵐⁿᵒᵖ۹ʳˢᵗᵘᵛʷˣʸᶻ⁰¹²³⁴⁵⁶⁷⁸⁹⁺⁻⁼⁽⁾",
+)
+SUBSCRIPT_TABLE = str.maketrans(
+    "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+-=()",
+    "ₐ₈CDₑբGₕᵢⱼₖₗₘₙₒₚQᵣₛₜᵤᵥwₓᵧZₐ♭꜀ᑯₑբ₉ₕᵢⱼₖₗₘₙₒₚ૧ᵣₛₜᵤᵥwₓᵧ₂₀₁₂₃₄₅₆₇₈₉₊₋₌₍₎",
+)
+
+
 def superscript(text):
-    normal = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+-=()"
-    super_s = "ᴬᴮᶜᴰᴱᶠᴳᴴᴵᴶᴷᴸᴹᴺᴼᴾQᴿˢᵀᵁⱽᵂˣʸᶻᵃᵇᶜᵈᵉᶠᵍʰᶦʲᵏˡᵐⁿᵒᵖ۹ʳˢᵗᵘᵛʷˣʸᶻ⁰¹²³⁴⁵⁶⁷⁸⁹⁺⁻⁼⁽⁾"
-    output = ""
-    for i in text:
-        output += super_s[normal.index(i)] if i in normal else i
-    return output
+    return str(text).translate(SUPERSCRIPT_TABLE)
 
 
 def subscript(text):
-    normal = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+-=()"
-    sub_s = "ₐ₈CDₑբGₕᵢⱼₖₗₘₙₒₚQᵣₛₜᵤᵥwₓᵧZₐ♭꜀ᑯₑբ₉ₕᵢⱼₖₗₘₙₒₚ૧ᵣₛₜᵤᵥwₓᵧ₂₀₁₂₃₄₅₆₇₈₉₊₋₌₍₎"
-    output = ""
-    for i in text:
-        output += sub_s[normal.index(i)] if i in normal else i
-    return output
+    return str(text).translate(SUBSCRIPT_TABLE)
@@ -0,0 +1,314 @@
+from bisect import bisect_left, bisect_right
+from datetime import date
+from heapq import merge
+
+
+BASE36_DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+
+def to_base36(value: int) -> str:
+    "Encodes non negative integer in base 36, used to keep dates in callback data short"
+    digits = ""
+    while True:
+        value, remainder = divmod(value, 36)
+        digits = BASE36_DIGITS[remainder] + digits
+        if not value:
+            return digits
+
+
+def to_ordinal(day) -> int:
+    "Accepts date, datetime or ordinal number of date"
+    return day if isinstance(day, int) else day.toordinal()
+
+
+def iter_weekday_dates(weekdays, start, until=None):
+    """Lazily yields dates falling on any of weekdays (0 is Monday) in order, starting from start
+
+    Generation is endless when until (inclusive) is not passed, e.g. every Tue/Thu since today:
+    iter_weekday_dates({1, 3}, date.today())
+    """
+    start = to_ordinal(start)
+    end = None if until is None else to_ordinal(until)
+    start_weekday = date.fromordinal(start).weekday()
+    offsets = sorted({(int(weekday) - start_weekday) % 7 for weekday in weekdays})
+    if not offsets:
+        return
+    week_start = start
+    while True:
+        for offset in offsets:
+            ordinal = week_start + offset
+            if end is not None and ordinal > end:
+                return
+            yield date.fromordinal(ordinal)
+        week_start += 7
+
+
+def merge_dates(*iterables):
+    "Lazily merges sorted iterables of dates into one sorted sequence without duplicates"
+    previous = None
+    for day in merge(*iterables):
+        if day != previous:
+            yield day
+            previous = day
+
+
+class DateIntervalSet:
+    """Set of dates stored as sorted non overlapping inclusive ranges of dates.
+
+    Adjacent and overlapping ranges are merged on insertion, membership check is a binary search,
+    so a selection of any amount of consecutive days costs a single range.
+    Serialized form is a comma separated list of `start-end` (or `day` for single day ranges)
+    with dates as base 36 ordinals, e.g. `fubh-fubv,fuc5`, it contains no `:` and fits callback data.
+    """
+
+    __slots__ = ("_starts", "_ends")
+
+    def __init__(self, ranges=()):
+        self._starts = []
+        self._ends = []
+        for start, end in ranges:
+            self.add(start, end)
+
+    def add(self, start, end=None):
+        "Adds range of dates from start to end inclusive, or a single day if end is not passed"
+        start = to_ordinal(start)
+        end = start if end is None else to_ordinal(end)
+        if end < start:
+            start, end = end, start
+        # ranges touching [start - 1, end + 1] are merged into the new one
+        i = bisect_left(self._ends, start - 1)
+        j = bisect_right(self._starts, end + 1)
+        if i < j:
+            start = min(start, self._starts[i])
+            end = max(end, self._ends[j - 1])
+        self._starts[i:j] = [start]
+        self._ends[i:j] = [end]
+
+    def copy(self) -> "DateIntervalSet":
+        intervals = type(self)()
+        intervals._starts = list(self._starts)
+        intervals._ends = list(self._ends)
+        return intervals
+
+    def remove(self, start, end=None):
+        "Removes range of dates from start to end inclusive, or a single day if end is not passed"
+        start = to_ordinal(start)
+        end = start if end is None else to_ordinal(end)
+        if end < start:
+            start, end = end, start
+        i = bisect_left(self._ends, start)
+        j = bisect_right(self._starts, end)
+        if i >= j:
+            return
+        starts, ends = [], []
+        if self._starts[i] < start:
+            starts.append(self._starts[i])
+            ends.append(start - 1)
+        if self._ends[j - 1] > end:
+            starts.append(end + 1)
+            ends.append(self._ends[j - 1])
+        self._starts[i:j] = starts
+        self._ends[i:j] = ends
+
+    def update(self, other: "DateIntervalSet"):
+        "Adds all ranges of other set"
+        for start, end in other.ordinal_ranges():
+            self.add(start, end)
+
+    def difference_update(self, other: "DateIntervalSet"):
+        "Removes all ranges of other set"
+        for start, end in other.ordinal_ranges():
+            self.remove(start, end)
+
+    def contains_range(self, start, end) -> bool:
+        "Checks all days from start to end inclusive are in set"
+        start, end = sorted((to_ordinal(start), to_ordinal(end)))
+        i = bisect_right(self._starts, start) - 1
+        return i >= 0 and self._ends[i] >= end
+
+    def ordinal_ranges(self):
+        "Yields ranges as (start, end) pairs of date ordinals"
+        return zip(self._starts, self._ends)
+
+    def ranges(self):
+        "Yields ranges as (start, end) pairs of dates"
+        for start, end in zip(self._starts, self._ends):
+            yield date.fromordinal(start), date.fromordinal(end)
+
+    def iter_dates(self, start=None, until=None):
+        "Lazily yields every date of set in order, optionally limited with start and until (inclusive)"
+        start = None if start is None else to_ordinal(start)
+        end = None if until is None else to_ordinal(until)
+        first = 0 if start is None else bisect_left(self._ends, start)
+        for i in range(first, len(self._starts)):
+            range_start, range_end = self._starts[i], self._ends[i]
+            if start is not None and range_start < start:
+                range_start = start
+            if end is not None and range_end > end:
+                if range_start > end:
+                    return
+                range_end = end
+            for ordinal in range(range_start, range_end + 1):
+                yield date.fromordinal(ordinal)
+
+    def __contains__(self, day) -> bool:
+        ordinal = to_ordinal(day)
+        i = bisect_right(self._starts, ordinal) - 1
+        return i >= 0 and self._ends[i] >= ordinal
+
+    def __len__(self) -> int:
+        "Number of ranges in set"
+        return len(self._starts)
+
+    def __bool__(self) -> bool:
+        return bool(self._starts)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, DateIntervalSet):
+            return NotImplemented
+        return self._starts == other._starts and self._ends == other._ends
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({list(self.ranges())!r})"
+
+    def dumps(self) -> str:
+        "Serializes set to compact string"
+        return ",".join(
+            to_base36(start) if start == end else f"{to_base36(start)}-{to_base36(end)}"
+            for start, end in zip(self._starts, self._ends)
+        )
+
+    @classmethod
+    def loads(cls, data: str) -> "DateIntervalSet":
+        "Restores set from string made by dumps"
+        intervals = cls()
+        for item in filter(None, (data or "").split(",")):
+            start, _, end = item.partition("-")
+            intervals.add(int(start, 36), int(end or start, 36))
+        return intervals
+
+
+class RecurrenceRule:
+    """Weekly recurrence of days of week, same as RRULE:FREQ=WEEKLY;BYDAY=..;INTERVAL=..;UNTIL=..;COUNT=..
+
+    Weeks start on Monday, week of start date is the first active one, then every interval-th week is active.
+    Rule is never expanded as a whole: membership and occurrence number of a date are computed arithmetically,
+    so a rule costs the same to store and check for a month or for a decade.
+    Serialized form is `weekdays.start.interval.until.count` with weekdays as bit mask and dates as base 36
+    ordinals, empty until and count are allowed, e.g. `a.fubh.1..` is every Tue/Thu since the start date.
+    """
+
+    __slots__ = ("weekdays", "start", "interval", "until", "count")
+
+    def __init__(self, weekdays, start, interval: int = 1, until=None, count: int = None):
+        """
+        Args:
+            weekdays: days of week to repeat on, 0 is Monday and 6 is Sunday
+            start: first date of recurrence
+            interval: recurrence happens every interval weeks
+            until: last date of recurrence (inclusive), if None - recurrence is endless
+            count: maximal amount of occurrences, if None - not limited
+        """
+        if interval < 1:
+            raise ValueError("Interval of recurrence rule have to be positive")
+        self.weekdays = frozenset(int(weekday) for weekday in weekdays)
+        self.start = date.fromordinal(to_ordinal(start))
+        self.interval = interval
+        self.until = None if until is None else date.fromordinal(to_ordinal(until))
+        self.count = count
+
+    def replace(self, **changes) -> "RecurrenceRule":
+        "Returns copy of rule with changed fields"
+        fields = {name: getattr(self, name) for name in self.__slots__}
+        fields.update(changes)
+        return type(self)(**fields)
+
+    def _first_week_start(self) -> int:
+        "Ordinal of Monday of the week of start date"
+        start = self.start.toordinal()
+        return start - self.start.weekday()
+
+    def _occurrences_before(self, ordinal: int) -> int:
+        "Amount of occurrences before date ordinal"
+        week, weekday = divmod(ordinal - self._first_week_start(), 7)
+        active_weeks = (week + self.interval - 1) // self.interval
+        skipped = sum(1 for day in self.weekdays if day < self.start.weekday())
+        if week % self.interval:
+            current = 0
+        else:
+            current = sum(1 for day in self.weekdays if day < weekday)
+        return active_weeks * len(self.weekdays) - skipped + current
+
+    def __contains__(self, day) -> bool:
+        ordinal = to_ordinal(day)
+        if ordinal < self.start.toordinal() or (self.until is not None and ordinal > self.until.toordinal()):
+            return False
+        week, weekday = divmod(ordinal - self._first_week_start(), 7)
+        if weekday not in self.weekdays or week % self.interval:
+            return False
+        return self.count is None or self._occurrences_before(ordinal) < self.count
+
+    def iter_dates(self, start=None, until=None):
+        "Lazily yields occurrences in order, optionally limited with start and until (inclusive)"
+        if not self.weekdays:
+            return
+        first = self.start.toordinal()
+        if start is not None:
+            first = max(first, to_ordinal(start))
+        ends = [to_ordinal(day) for day in (self.until, until) if day is not None]
+        last = min(ends) if ends else None
+
+        week_start = self._first_week_start()
+        # jumping straight to the first active week containing first date
+        week = (first - week_start) // 7
+        week += -week % self.interval
+        index = self._occurrences_before(max(first, week_start + week * 7))
+        weekdays = sorted(self.weekdays)
+        while True:
+            for weekday in weekdays:
+                ordinal = week_start + week * 7 + weekday
+                if ordinal < first:
+                    continue
+                if (last is not None and ordinal > last) or (self.count is not None and index >= self.count):
+                    return
+                index += 1
+                yield date.fromordinal(ordinal)
+            week += self.interval
+
+    def month_days(self, year: int, month: int) -> frozenset:
+        "Returns day numbers of occurrences in month"
+        first = date(year, month, 1)
+        last = date(year + month // 12, month % 12 + 1, 1).toordinal() - 1
+        return frozenset(day.day for day in self.iter_dates(first, last))
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, RecurrenceRule):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+    def dumps(self) -> str:
+        "Serializes rule to compact string"
+        return ".".join((
+            to_base36(sum(1 << weekday for weekday in self.weekdays)),
+            to_base36(self.start.toordinal()),
+            to_base36(self.interval),
+            "" if self.until is None else to_base36(self.until.toordinal()),
+            "" if self.count is None else to_base36(self.count),
+        ))
+
+    @classmethod
+    def loads(cls, data: str) -> "RecurrenceRule":
+        "Restores rule from string made by dumps"
+        weekdays, start, interval, until, count = data.split(".")
+        mask = int(weekdays, 36)
+        return cls(
+            weekdays=(weekday for weekday in range(7) if mask & (1 << weekday)),
+            start=int(start, 36),
+            interval=int(interval, 36),
+            until=int(until, 36) if until else None,
+            count=int(count, 36) if count else None,
+        )
@@ -0,0 +1,102 @@
+import asyncio
+from collections import OrderedDict
+from typing import NamedTuple
+
+from .selection import DateIntervalSet, RecurrenceRule
+
+
+class SelectionDelta(NamedTuple):
+    version: int
+    change: str  # result of MultipleCalendar.process_selection, e.g. "add:01.05.30" or "rule:<rule>"
+
+
+class SelectionSession:
+    """Selection of one calendar message shared by concurrent handlers of its taps
+
+    Pass session to MultipleCalendar.process_selection: taps of one message are processed one at a time under
+    the lock of its session, taps of other messages are not blocked. Every change of selection increases
+    version and is recorded as a delta, so it can be persisted in order:
+    storage keeps state with the greatest version it has seen and ignores older snapshots.
+    """
+
+    __slots__ = ("lock", "version", "selected_days", "selected_ranges", "weekday_rule", "range_start", "_deltas")
+
+    def __init__(self, selected_days=(), selected_ranges=None, weekday_rule=None, version: int = 0):
+        """
+        Args:
+            selected_days: dates in format dd.mm.yy
+            selected_ranges: DateIntervalSet or its serialized form, set is copied so session changes its own
+            weekday_rule: RecurrenceRule or its serialized form
+            version: version of persisted state session is restored from
+        """
+        self.lock = asyncio.Lock()
+        self.version = version
+        self.selected_days = list(dict.fromkeys(selected_days))
+        if isinstance(selected_ranges, DateIntervalSet):
+            selected_ranges = selected_ranges.copy()
+        else:
+            selected_ranges = DateIntervalSet.loads(selected_ranges)
+        self.selected_ranges = selected_ranges
+        if isinstance(weekday_rule, str):
+            weekday_rule = RecurrenceRule.loads(weekday_rule) if weekday_rule else None
+        self.weekday_rule = weekday_rule
+        self.range_start = None  # first day of range being picked in range mode, it is not persisted
+        self._deltas = []
+
+    def record(self, change: str) -> SelectionDelta:
+        "Records applied change of selection with the next version"
+        self.version += 1
+        delta = SelectionDelta(self.version, change)
+        self._deltas.append(delta)
+        return delta
+
+    def pop_deltas(self) -> list:
+        "Returns changes recorded since previous call in order of versions"
+        deltas, self._deltas = self._deltas, []
+        return deltas
+
+    def snapshot(self) -> dict:
+        "Returns serializable state of selection with its version"
+        return {
+            "version": self.version,
+            "selected_days": list(self.selected_days),
+            "selected_ranges": self.selected_ranges.dumps(),
+            "weekday_rule": self.weekday_rule.dumps() if self.weekday_rule else "",
+        }
+
+
+class SelectionSessions:
+    """Sessions of calendar messages in memory of process, the least recently used ones are dropped over maxsize
+
+    All handlers of one message have to be processed by the same process, e.g. a single polling worker
+    or webhook workers routed by chat.
+    """
+
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self._sessions = OrderedDict()
+
+    @staticmethod
+    def get_key(query) -> tuple:
+        "Returns key of calendar message of callback query"
+        return query.message.chat.id, query.message.message_id
+
+    def get(self, key, **initial) -> SelectionSession:
+        """Returns session of key, new session is created from initial state (arguments of SelectionSession)
+        when key is seen for the first time or was dropped
+        """
+        session = self._sessions.get(key)
+        if session is None:
+            session = self._sessions[key] = SelectionSession(**initial)
+            if len(self._sessions) > self.maxsize:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(key)
+        return session
+
+    def pop(self, key):
+        "Drops session, e.g. when selection is saved"
+        return self._sessions.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
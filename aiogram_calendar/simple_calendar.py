@@ -1,15 +1,30 @@
-import calendar
-from datetime import datetime, timedelta
+from datetime import datetime
 
-from aiogram.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup
+from aiogram.types import CallbackQuery, InlineKeyboardMarkup
 
-from .common import GenericCalendar
-from .schemas import SimpleCalAct, SimpleCalendarCallback, highlight, superscript
+from . import day_labels
+from .buttons import PackedCallback, pack_callback
+from .common import MAX_KEYBOARD_BUTTONS, GenericCalendar, get_month_days, shift_month
+from .schemas import SimpleCalAct, SimpleCalendarCallback, highlight
 
 
 class SimpleCalendar(GenericCalendar):
 
-    ignore_callback = SimpleCalendarCallback(act=SimpleCalAct.ignore).pack()  # placeholder for no answer buttons
+    __slots__ = ("months_shown",)
+
+    callback_cls = SimpleCalendarCallback  # callback data of buttons, subclasses can use their own prefix
+    # placeholder for no answer buttons, packed on first use
+    ignore_callback = PackedCallback(SimpleCalendarCallback, act=SimpleCalAct.ignore)
+
+    def __init__(self, *args, months_shown: int = 1, **kwargs) -> None:
+        """Accepts all parameters of GenericCalendar and
+
+        Parameters:
+        months_shown (int): amount of consecutive months shown in one keyboard, months not fitting into
+            Telegram limit of 100 buttons are not shown, navigation buttons move by months actually shown
+        """
+        super().__init__(*args, **kwargs)
+        self.months_shown = max(1, months_shown)
 
     async def start_calendar(
         self,
@@ -27,10 +42,18 @@ class SimpleCalendar(GenericCalendar):
         Returns:
             InlineKeyboardMarkup: InlineKeyboardMarkup with the calendar
         """
+        return self.render_calendar(year, month, day)
+
+    def _render_calendar(self, target, year: int = None, month: int = None, day: int = None):
+        """Builds keyboard of start_calendar with render target"""
 
         today = datetime.now()
-        now_weekday = self._labels.days_of_week[today.weekday()]
-        now_month, now_year, now_day = today.month, today.year, today.day
+        year = year or today.year
+        month = month or today.month
+        now_weekday = today.weekday()
+        now_month, now_year = today.month, today.year
+
+        shown_months = self._get_shown_months(year, month)
 
         def highlight_month():
             month_str = self._labels.months[month - 1]
@@ -38,106 +61,121 @@ class SimpleCalendar(GenericCalendar):
                 return highlight(month_str)
             return month_str
 
-        def highlight_weekday():
-            if now_month == month and now_year == year and now_weekday == weekday:
-                return highlight(weekday)
-            return weekday
-
-        def format_day_string():
-            date_to_check = datetime(year, month, day)
-            if self.min_date and date_to_check < self.min_date:
-                return superscript(str(day))
-            elif self.max_date and date_to_check > self.max_date:
-                return superscript(str(day))
-            return str(day)
-
-        def highlight_day():
-            day_string = format_day_string()
-            if now_month == month and now_year == year and now_day == day:
-                return highlight(day_string)
-            return day_string
+        def highlight_weekday(weekday, weekday_label):
+            if (now_year, now_month) in shown_months and now_weekday == weekday:
+                return highlight(weekday_label)
+            return weekday_label
 
-        # building a calendar keyboard
+        # building a calendar keyboard, only day buttons are created, other rows are taken from buttons pool
         kb = []
 
-        # inline_kb = InlineKeyboardMarkup(row_width=7)
         # First row - Year
-        first_row = []
-
-        first_row.append(
-            InlineKeyboardButton(
-                text=str(year) if year != now_year else highlight(year), callback_data=self.ignore_callback
-            )
-        )
-
-        first_row.append(InlineKeyboardButton(text=highlight_month(), callback_data=self.ignore_callback))
+        first_row = target.row((
+            (str(year) if year != now_year else highlight(year), self.ignore_callback),
+            (highlight_month(), self.ignore_callback),
+        ))
         kb.append(first_row)
 
-        second_row = []
         if year == now_year and month == now_month:
-            second_row.append(InlineKeyboardButton(text=" ", callback_data=self.ignore_callback))
-
+            prev_button = (" ", self.ignore_callback)
         else:
-            second_row.append(
-                InlineKeyboardButton(
-                    text="<",
-                    callback_data=SimpleCalendarCallback(act=SimpleCalAct.prev_m, year=year, month=month, day=1).pack(),
-                )
-            )
-
-        second_row.append(
-            InlineKeyboardButton(
-                text=">",
-                callback_data=SimpleCalendarCallback(act=SimpleCalAct.next_m, year=year, month=month, day=1).pack(),
+            prev_button = (
+                "<", pack_callback(self.callback_cls, act=SimpleCalAct.prev_m, year=year, month=month, day=1)
             )
+        next_button = (
+            ">", pack_callback(self.callback_cls, act=SimpleCalAct.next_m, year=year, month=month, day=1)
         )
-        kb.append(second_row)
+        kb.append(target.row((prev_button, next_button)))
 
         # Week Days
-        week_days_labels_row = []
-        for weekday in self._labels.days_of_week:
-            week_days_labels_row.append(
-                InlineKeyboardButton(text=highlight_weekday(), callback_data=self.ignore_callback)
-            )
-        kb.append(week_days_labels_row)
+        kb.append(target.row(tuple(
+            (highlight_weekday(weekday, label), self.ignore_callback) for weekday, label in self._week_layout
+        )))
+
+        # Calendar rows - Days of month, next months are separated with a row with their name
+        for shown_year, shown_month in shown_months:
+            if (shown_year, shown_month) != (year, month):
+                month_str = self._labels.months[shown_month - 1]
+                if shown_year != year:
+                    month_str = f"{month_str} {shown_year}"
+                if (shown_year, shown_month) == (now_year, now_month):
+                    month_str = highlight(month_str)
+                kb.append(target.row(((month_str, self.ignore_callback),)))
+            kb.extend(self._get_days_rows(target, shown_year, shown_month, today))
 
-        # Calendar rows - Days of month
-        month_calendar = calendar.monthcalendar(year, month)
+        # nav today & cancel button
+        cancel_row = target.row((
+            (
+                self._labels.cancel_caption,
+                pack_callback(self.callback_cls, act=SimpleCalAct.cancel, year=year, month=month, day=1),
+            ),
+            (" ", self.ignore_callback),
+            (
+                self._labels.today_caption,
+                pack_callback(self.callback_cls, act=SimpleCalAct.today, year=year, month=month, day=1),
+            ),
+        ))
+        kb.append(cancel_row)
+        return target.markup(kb, row_width=7)
+
+    def _get_shown_months(self, year: int, month: int) -> list:
+        """Returns (year, month) pairs of months to show starting from passed one, as many of months_shown
+        as fit into Telegram limit of buttons in keyboard
+        """
+        # year & month row, navigation row, days of week row and cancel row
+        buttons = 2 + 2 + 7 + 3
+        shown_months = []
+        for i in range(self.months_shown):
+            shown_year, shown_month = shift_month(year, month, i)
+            month_buttons = len(get_month_days(shown_year, shown_month, self.firstweekday)) * 7 + (1 if i else 0)
+            if shown_months and buttons + month_buttons > MAX_KEYBOARD_BUTTONS:
+                break
+            buttons += month_buttons
+            shown_months.append((shown_year, shown_month))
+        return shown_months
+
+    def _get_previous_page(self, year: int, month: int) -> tuple:
+        """Returns (year, month) keyboard ending right before month starts with, it may show less than
+        months_shown months, so the longest page ending before month is searched
+        """
+        for months in range(self.months_shown, 1, -1):
+            start = shift_month(year, month, -months)
+            if len(self._get_shown_months(*start)) >= months:
+                return start
+        return shift_month(year, month, -1)
+
+    def _get_days_rows(self, target, year: int, month: int, today: datetime) -> list:
+        """Builds rows with days of month, past days of current month are left empty"""
+        now_month, now_year, now_day = today.month, today.year, today.day
+
+        def get_day_style():
+            date_to_check = datetime(year, month, day)
+            style = day_labels.PLAIN
+            if (self.min_date and date_to_check < self.min_date) or (self.max_date and date_to_check > self.max_date):
+                style |= day_labels.SUPERSCRIPT
+            if now_month == month and now_year == year and now_day == day:
+                style |= day_labels.HIGHLIGHTED
+            return style
 
-        for week in month_calendar:
+        rows = []
+        empty_button = target.static_button(" ", self.ignore_callback)
+        for week in get_month_days(year, month, self.firstweekday):
             days_row = []
             for day in week:
                 if day == 0 or (month == now_month and year == now_year and day < now_day):
-                    days_row.append(InlineKeyboardButton(text=" ", callback_data=self.ignore_callback))
+                    days_row.append(empty_button)
                     continue
                 days_row.append(
-                    InlineKeyboardButton(
-                        text=highlight_day(),
-                        callback_data=SimpleCalendarCallback(
-                            act=SimpleCalAct.day, year=year, month=month, day=day
-                        ).pack(),
+                    target.button(
+                        day_labels.day_label(day, get_day_style()),
+                        self.callback_cls(act=SimpleCalAct.day, year=year, month=month, day=day).pack(),
                     )
                 )
-            kb.append(days_row)
+            rows.append(days_row)
+        return rows
 
-        # nav today & cancel button
-        cancel_row = []
-
-        cancel_row.append(
-            InlineKeyboardButton(
-                text=self._labels.cancel_caption,
-                callback_data=SimpleCalendarCallback(act=SimpleCalAct.cancel, year=year, month=month, day=day).pack(),
-            )
-        )
-        cancel_row.append(InlineKeyboardButton(text=" ", callback_data=self.ignore_callback))
-        cancel_row.append(
-            InlineKeyboardButton(
-                text=self._labels.today_caption,
-                callback_data=SimpleCalendarCallback(act=SimpleCalAct.today, year=year, month=month, day=day).pack(),
-            )
-        )
-        kb.append(cancel_row)
-        return InlineKeyboardMarkup(row_width=7, inline_keyboard=kb)
+    def _get_render_key(self, args: tuple, kwargs: dict) -> tuple:
+        return super()._get_render_key(args, kwargs) + (self.months_shown,)
 
     async def _update_calendar(self, query: CallbackQuery, with_date: datetime):
         await query.message.edit_reply_markup(
@@ -160,6 +198,10 @@ class SimpleCalendar(GenericCalendar):
             await query.answer(cache_time=60)
             return return_data
 
+        # taps on keyboards rendered with previous epoch are answered without processing
+        if await self.process_stale(query, data):
+            return return_data
+
         temp_date = datetime(int(data.year), int(data.month), 1)
 
         # user picked a day button, return date
@@ -176,14 +218,15 @@ class SimpleCalendar(GenericCalendar):
             next_date = datetime(int(data.year) + 1, int(data.month), 1)
             await self._update_calendar(query, next_date)
 
-        # user navigates to previous month, editing message with new calendar
+        # user navigates to previous months, editing message with new calendar
         if data.act == SimpleCalAct.prev_m:
-            prev_date = temp_date - timedelta(days=1)
+            prev_date = datetime(*self._get_previous_page(temp_date.year, temp_date.month), 1)
             await self._update_calendar(query, prev_date)
 
-        # user navigates to next month, editing message with new calendar
+        # user navigates to next months, editing message with new calendar
         if data.act == SimpleCalAct.next_m:
-            next_date = temp_date + timedelta(days=31)
+            shown = len(self._get_shown_months(temp_date.year, temp_date.month))
+            next_date = datetime(*shift_month(temp_date.year, temp_date.month, shown), 1)
 
             await self._update_calendar(query, next_date)
 
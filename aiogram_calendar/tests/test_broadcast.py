@@ -0,0 +1,99 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from aiogram_calendar import BroadcastRecipient, DialogCalendar, broadcast_calendar
+from aiogram_calendar.broadcast import RateLimiter
+
+
+class RecordingBot:
+    "Records sent messages, blocked chats fail and flooded chats are limited once"
+
+    def __init__(self, blocked=(), flooded=()):
+        self.sent = []
+        self.blocked = set(blocked)
+        self.flooded = set(flooded)
+        self.in_flight = self.max_in_flight = 0
+
+    async def send_message(self, chat_id, text, reply_markup=None):
+        method = SendMessage(chat_id=chat_id, text=text)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0)
+            if chat_id in self.blocked:
+                raise TelegramForbiddenError(method, "bot was blocked by the user")
+            if chat_id in self.flooded:
+                self.flooded.discard(chat_id)
+                raise TelegramRetryAfter(method, "Too Many Requests", retry_after=0)
+            self.sent.append((chat_id, text, reply_markup))
+        finally:
+            self.in_flight -= 1
+
+
+@pytest.mark.asyncio
+async def test_broadcast_calendar():
+    bot = RecordingBot(blocked={3}, flooded={5})
+    report = await broadcast_calendar(bot, range(1, 101), "Pick your delivery date", concurrency=4, rate=10000)
+
+    assert report.sent == 99 and report.renders == 1
+    assert list(report.failures) == [3] and isinstance(report.failures[3], TelegramForbiddenError)
+    assert {chat_id for chat_id, _, _ in bot.sent} == set(range(1, 101)) - {3}
+    # one keyboard is shared by all chats
+    assert len({id(markup) for _, _, markup in bot.sent}) == 1
+    assert bot.max_in_flight == 4
+
+
+class FloodedBot(RecordingBot):
+    "Flood control of the whole bot: a send starts it, every send while it lasts fails and prolongs it"
+
+    def __init__(self, flood_at: int, retry_after: float):
+        super().__init__()
+        self.flood_at = flood_at
+        self.retry_after = retry_after
+        self.flood_until = 0.0
+        self.attempts = 0
+
+    async def send_message(self, chat_id, text, reply_markup=None):
+        now = asyncio.get_running_loop().time()
+        self.attempts += 1
+        if self.attempts == self.flood_at or now < self.flood_until:
+            self.flood_until = now + self.retry_after
+            raise TelegramRetryAfter(SendMessage(chat_id=chat_id, text=text), "Too Many Requests", self.retry_after)
+        await super().send_message(chat_id, text, reply_markup)
+
+
+@pytest.mark.asyncio
+async def test_broadcast_pauses_all_sends_on_flood_control():
+    bot = FloodedBot(flood_at=3, retry_after=0.1)
+    report = await broadcast_calendar(bot, range(1, 11), "Pick a date", concurrency=4, rate=100, retries=1)
+    assert report.sent == 10 and not report.failures
+    # only the send starting flood control failed, other sends waited for its end
+    assert bot.attempts == 11
+
+
+@pytest.mark.asyncio
+async def test_broadcast_renders_once_per_view():
+    bot = RecordingBot()
+    march, april = BroadcastRecipient(1, year=2030, month=3), BroadcastRecipient(2, year=2030, month=4)
+    ranged = BroadcastRecipient(3, year=2030, month=3, min_date=datetime(2030, 3, 10))
+    recipients = [march, april, ranged, march._replace(chat_id=4), april._replace(chat_id=5)]
+    report = await broadcast_calendar(bot, recipients, "Pick a date", calendar_cls=DialogCalendar, rate=10000)
+
+    assert report.sent == 5 and report.renders == 3 and not report.failures
+    markups = {chat_id: markup for chat_id, _, markup in bot.sent}
+    assert markups[1] is markups[4] and markups[2] is markups[5]
+    assert markups[1] is not markups[3]
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter():
+    limiter = RateLimiter(rate=100)
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    await asyncio.gather(*(limiter.acquire() for _ in range(6)))
+    # the first acquisition is immediate, the others are spaced by 10 ms
+    assert loop.time() - start >= 0.045
@@ -0,0 +1,29 @@
+import pytest
+from pydantic import ValidationError
+
+from aiogram_calendar import DialogCalendar, SimpleCalendar
+from aiogram_calendar.buttons import StaticButton, static_row
+
+
+@pytest.mark.asyncio
+async def test_static_rows_are_shared_between_renders():
+    first = (await SimpleCalendar().start_calendar(year=2030, month=5)).inline_keyboard
+    second = (await SimpleCalendar().start_calendar(year=2030, month=5)).inline_keyboard
+    # header, navigation, weekdays and cancel rows are reused, day buttons are created on every render
+    for row in (0, 1, 2, -1):
+        assert all(a is b for a, b in zip(first[row], second[row]))
+    assert first[3][-1] is not second[3][-1]
+
+
+@pytest.mark.asyncio
+async def test_static_rows_differ_per_labels():
+    first = (await DialogCalendar(cancel_btn="Cancel").start_calendar(year=2030)).inline_keyboard
+    second = (await DialogCalendar(cancel_btn="Back").start_calendar(year=2030)).inline_keyboard
+    assert first[1][2].text == "Cancel" and second[1][2].text == "Back"
+
+
+def test_static_button_is_immutable():
+    button = static_row((("text", "callback"),))[0]
+    assert isinstance(button, StaticButton)
+    with pytest.raises(ValidationError):
+        button.text = "changed"
@@ -0,0 +1,193 @@
+import threading
+
+import pytest
+
+from aiogram_calendar import SimpleCalendar
+from aiogram_calendar import cache
+from aiogram_calendar.cache import LRUBackend, MmapBackend, RedisBackend, SharedCache
+
+
+class FakeRedisSocket:
+    "In-memory stand-in of Redis server connection, parses commands of RESP protocol"
+
+    def __init__(self, server):
+        self.server = server
+        self.replies = b""
+        self.closed = False
+
+    def sendall(self, data: bytes):
+        args, rest = self._parse(data)
+        assert not rest
+        self.server.commands.append(args[0])
+        self.replies += self.server.execute(args)
+
+    @staticmethod
+    def _parse(data: bytes):
+        header, data = data.split(b"\r\n", 1)
+        args = []
+        for _ in range(int(header[1:])):
+            length, data = data.split(b"\r\n", 1)
+            length = int(length[1:])
+            args.append(data[:length])
+            data = data[length + 2:]
+        return args, data
+
+    def recv(self, size: int) -> bytes:
+        data, self.replies = self.replies[:size], self.replies[size:]
+        return data
+
+    def close(self):
+        self.closed = True
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.commands = []
+        self.down = False
+        self.connects = 0
+
+    def connect(self):
+        self.connects += 1
+        if self.down:
+            raise ConnectionRefusedError()
+        return FakeRedisSocket(self)
+
+    @staticmethod
+    def bulk(value):
+        return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+
+    def execute(self, args) -> bytes:
+        command = args[0].upper()
+        if command == b"GET":
+            return self.bulk(self.data.get(args[1]))
+        if command == b"SET":
+            self.data[args[1]] = args[2]
+            return b"+OK\r\n"
+        if command == b"SCAN":
+            prefix = args[3].rstrip(b"*")
+            keys = [key for key in self.data if key.startswith(prefix)]
+            return b"*2\r\n$1\r\n0\r\n*%d\r\n%s" % (len(keys), b"".join(self.bulk(key) for key in keys))
+        if command == b"DEL":
+            for key in args[1:]:
+                self.data.pop(key, None)
+            return b":%d\r\n" % (len(args) - 1)
+        return b"-ERR unknown command\r\n"
+
+
+def test_lru_backend():
+    backend = LRUBackend(maxsize=2)
+    backend.set("a", b"1")
+    backend.set("b", b"2")
+    backend.get("a")
+    backend.set("c", b"3")
+    assert backend.get("b") is None and backend.get("a") == b"1"
+    backend.clear("c")
+    assert backend.get("c") is None and backend.get("a") == b"1"
+
+
+def test_mmap_backend_is_shared(tmp_path):
+    path = str(tmp_path / "cache")
+    first, second = MmapBackend(path, slots=16, slot_size=256), MmapBackend(path, slots=16, slot_size=256)
+    first.set("key", b"value")
+    assert second.get("key") == b"value"
+    assert second.get("other") is None
+    # values not fitting into slot are not stored
+    first.set("large", b"x" * 256)
+    assert second.get("large") is None
+    second.clear()
+    assert first.get("key") is None
+
+
+def test_mmap_backend_torn_value_is_miss(tmp_path):
+    backend = MmapBackend(str(tmp_path / "cache"), slots=1, slot_size=256)
+    backend.set("key", b"value")
+    backend._map[backend.HEADER.size] = ord("V")
+    assert backend.get("key") is None
+
+
+def test_redis_backend():
+    server = FakeRedis()
+    backend = RedisBackend(connect=server.connect, ttl=None)
+    assert backend.get("key") is None
+    backend.set("key", b"\r\nvalue")
+    assert backend.get("key") == b"\r\nvalue"
+    backend.set("other:key", b"1")
+    backend.clear("key")
+    assert server.data == {b"other:key": b"1"}
+
+
+def test_redis_backend_down_is_miss():
+    server = FakeRedis()
+    server.down = True
+    backend = RedisBackend(connect=server.connect, retry_after=0)
+    backend.set("key", b"value")
+    assert backend.get("key") is None
+    server.down = False
+    backend.set("key", b"value")
+    assert backend.get("key") == b"value"
+
+
+def test_redis_backend_down_is_skipped(monkeypatch):
+    server = FakeRedis()
+    server.down = True
+    backend = RedisBackend(connect=server.connect, retry_after=30)
+    for _ in range(10):
+        backend.set("key", b"value")
+        assert backend.get("key") is None
+    # renders do not wait for connection timeout while server is down
+    assert server.connects == 1
+
+    server.down = False
+    assert backend.get("key") is None and server.connects == 1
+    now = cache.monotonic()
+    monkeypatch.setattr(cache, "monotonic", lambda: now + 31)
+    backend.set("key", b"value")
+    assert backend.get("key") == b"value" and server.connects == 2
+
+
+def test_keys_are_versioned(monkeypatch):
+    shared = SharedCache(LRUBackend())
+    shared.set("markup", ("SimpleCalendar", 2030), b"value")
+    assert shared.get("markup", ("SimpleCalendar", 2030)) == b"value"
+    monkeypatch.setattr(cache, "CACHE_VERSION", cache.CACHE_VERSION + 1)
+    assert shared.get("markup", ("SimpleCalendar", 2030)) is None
+
+
+def test_shared_backend_is_fronted_with_local_cache():
+    server = FakeRedis()
+    shared = SharedCache(RedisBackend(connect=server.connect))
+    shared.set("markup", ("key",), b"value")
+    server.commands.clear()
+    assert shared.get("markup", ("key",)) == b"value"
+    assert server.commands == []
+
+
+@pytest.mark.asyncio
+async def test_blocking_backend_is_read_off_event_loop(monkeypatch):
+    server = FakeRedis()
+    threads = []
+    connect = server.connect
+
+    def connect_in_thread():
+        threads.append(threading.current_thread())
+        return connect()
+
+    monkeypatch.setattr("aiogram_calendar.common.render_cache", SharedCache(RedisBackend(connect=connect_in_thread)))
+    await SimpleCalendar().start_calendar_json(year=2030, month=5)
+    assert threads and threading.main_thread() not in threads
+    assert server.commands == [b"GET", b"SET"]
+
+
+# keyboard rendered by one worker is taken from cache by another one
+@pytest.mark.asyncio
+async def test_workers_share_rendered_keyboards(monkeypatch):
+    server = FakeRedis()
+    worker = SharedCache(RedisBackend(connect=server.connect))
+    monkeypatch.setattr("aiogram_calendar.common.render_cache", worker)
+    rendered = await SimpleCalendar().start_calendar_json(year=2030, month=5)
+
+    other_worker = SharedCache(RedisBackend(connect=server.connect))
+    monkeypatch.setattr("aiogram_calendar.common.render_cache", other_worker)
+    monkeypatch.setattr(SimpleCalendar, "_render_calendar", None)
+    assert await SimpleCalendar().start_calendar_json(year=2030, month=5) == rendered
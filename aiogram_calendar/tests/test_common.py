@@ -0,0 +1,82 @@
+import locale
+from unittest.mock import Mock
+
+import pytest
+
+from aiogram_calendar import CalendarLabels, DialogCalendar, MultipleCalendar, SimpleCalendar, common, \
+    get_user_locale, resolve_locale
+from aiogram_calendar.schemas import DEFAULT_LABELS, get_labels
+
+
+@pytest.fixture
+def installed_locales(monkeypatch):
+    "Pretends only pt_BR and uk_UA locales are installed in the system"
+    def get_locale_labels(loc):
+        if loc not in ("pt_BR", "uk_UA"):
+            raise locale.Error("unsupported locale setting")
+        return (), ()
+
+    monkeypatch.setattr(common, "get_locale_labels", get_locale_labels)
+    resolve_locale.cache_clear()
+    yield
+    resolve_locale.cache_clear()
+
+
+testset = [
+    ("pt-br", "pt_BR"),
+    ("PT_BR", "pt_BR"),
+    ("uk", "uk_UA"),
+    ("pt", None),  # pt_PT is not installed
+    ("de-at", None),
+    ("xx-yy", None),
+    ("", None),
+    (None, None),
+]
+
+
+@pytest.mark.parametrize("language_code, expected", testset)
+def test_resolve_locale(installed_locales, language_code, expected):
+    assert resolve_locale(language_code) == expected
+    assert resolve_locale(language_code, "uk_UA") == (expected or "uk_UA")
+
+
+@pytest.mark.asyncio
+async def test_get_user_locale(installed_locales):
+    assert await get_user_locale(Mock(language_code="pt-br")) == "pt_BR"
+    assert await get_user_locale(Mock(language_code=None)) is None
+
+
+def test_labels_are_interned():
+    assert SimpleCalendar()._labels is DialogCalendar()._labels is DEFAULT_LABELS
+    first, second = SimpleCalendar(cancel_btn="Cancel"), DialogCalendar(cancel_btn="Cancel")
+    assert first._labels is second._labels
+    assert first._labels.cancel_caption == "Cancel" and first._labels.months == DEFAULT_LABELS.months
+    assert not hasattr(first, "__dict__")
+
+
+def test_calendar_labels_are_accepted():
+    days = ["Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"]
+    labels = CalendarLabels(
+        cancel_caption="Cancel", days_of_week=days, months=[str(month) for month in range(1, 13)]
+    )
+    calendar = SimpleCalendar(labels=labels, today_btn="Today")
+    assert calendar._labels.cancel_caption == "Cancel" and calendar._labels.today_caption == "Today"
+    assert calendar._labels.months[11] == "12"
+    assert SimpleCalendar(labels=calendar._labels)._labels is get_labels(*calendar._labels)
+
+    # days of week of labels are rendered by every calendar, in order of first day of week
+    keyboards = (
+        SimpleCalendar(labels=labels, firstweekday=6).render_calendar(2030, 5),
+        DialogCalendar(labels=labels, firstweekday=6).render_days(2030, 5),
+        MultipleCalendar(labels=labels, firstweekday=6).render_calendar(2030, 5),
+    )
+    for markup in keyboards:
+        rows = [[button.text for button in row] for row in markup.inline_keyboard]
+        assert days[6:] + days[:6] in rows
+
+
+def test_labels_are_validated():
+    with pytest.raises(ValueError):
+        get_labels(DEFAULT_LABELS.days_of_week[:6], *DEFAULT_LABELS[1:])
+    with pytest.raises(ValueError):
+        get_labels(DEFAULT_LABELS.days_of_week, DEFAULT_LABELS.months + ("13",), *DEFAULT_LABELS[2:])
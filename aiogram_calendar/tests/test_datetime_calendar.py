@@ -0,0 +1,92 @@
+from datetime import datetime, time
+from unittest.mock import AsyncMock
+
+import pytest
+
+from aiogram_calendar import DateTimeCalendar
+from aiogram_calendar.datetime_calendar import get_slots_grid
+from aiogram_calendar.schemas import DateTimeCalendarCallback
+
+
+def test_init():
+    with pytest.raises(ValueError):
+        DateTimeCalendar(time_step=0)
+    with pytest.raises(ValueError):
+        DateTimeCalendar(day_start=time(18), day_end=time(9))
+
+
+@pytest.mark.asyncio
+async def test_days_use_own_prefix():
+    kb = (await DateTimeCalendar().start_calendar(year=2030, month=5)).inline_keyboard
+    data = DateTimeCalendarCallback.unpack(kb[3][-1].callback_data)
+    assert data.act == "DAY" and (data.year, data.month) == (2030, 5)
+
+
+# picking a day edits the same message with slots of that day, picking a slot returns date with time
+@pytest.mark.asyncio
+async def test_pick_date_and_time():
+    calendar = DateTimeCalendar(time_step=30, day_start=time(9), day_end=time(18))
+    query = AsyncMock()
+    day = DateTimeCalendarCallback(act="DAY", year=2030, month=5, day=14)
+    assert await calendar.process_selection(query, day) == (False, None)
+
+    kb = query.message.edit_reply_markup.call_args.kwargs["reply_markup"].inline_keyboard
+    assert kb[0][0].text == "14 May 2030"
+    assert [button.text for button in kb[1]] == ["09:00", "09:30", "10:00", "10:30"]
+    assert sum(len(row) for row in kb[1:-1]) == 18
+
+    slot = DateTimeCalendarCallback.unpack(kb[1][3].callback_data)
+    assert slot.minute == 10 * 60 + 30
+    assert await calendar.process_selection(query, slot) == (True, datetime(2030, 5, 14, 10, 30))
+    query.message.delete_reply_markup.assert_awaited_once()
+
+
+# slots not fitting into one keyboard are picked as hour and then minute
+@pytest.mark.asyncio
+async def test_pick_hour_first():
+    calendar = DateTimeCalendar(time_step=5)
+    assert calendar.pick_hour_first
+    query = AsyncMock()
+    await calendar.process_selection(query, DateTimeCalendarCallback(act="DAY", year=2030, month=5, day=14))
+    kb = query.message.edit_reply_markup.call_args.kwargs["reply_markup"].inline_keyboard
+    assert sum(len(row) for row in kb[1:-1]) == 24
+
+    hour = DateTimeCalendarCallback.unpack(kb[3][1].callback_data)
+    assert hour.act == "HOUR" and hour.minute == 13 * 60
+    await calendar.process_selection(query, hour)
+    kb = query.message.edit_reply_markup.call_args.kwargs["reply_markup"].inline_keyboard
+    assert kb[1][0].text == "13:00" and kb[-2][-1].text == "13:55"
+
+    back = DateTimeCalendarCallback.unpack(kb[-1][0].callback_data)
+    assert back.act == "DAY" and back.day == 14
+
+
+@pytest.mark.asyncio
+async def test_time_out_of_range():
+    calendar = DateTimeCalendar()
+    calendar.set_dates_range(datetime(2030, 5, 14, 12), datetime(2030, 6, 1))
+    query = AsyncMock()
+    slot = DateTimeCalendarCallback(act="TIME", year=2030, month=5, day=14, minute=11 * 60)
+    assert await calendar.process_selection(query, slot) == (False, None)
+    query.answer.assert_awaited_once()
+    # day is allowed while part of it is in range
+    await calendar.process_selection(query, DateTimeCalendarCallback(act="DAY", year=2030, month=5, day=14))
+    query.message.edit_reply_markup.assert_awaited_once()
+
+
+def test_slots_grid_is_cached():
+    assert get_slots_grid(15, 0, 120, 4) is get_slots_grid(15, 0, 120, 4)
+    assert get_slots_grid(15, 0, 120, 4) == (
+        (("00:00", 0), ("00:15", 15), ("00:30", 30), ("00:45", 45)),
+        (("01:00", 60), ("01:15", 75), ("01:30", 90), ("01:45", 105)),
+    )
+
+
+@pytest.mark.asyncio
+async def test_completion_mode():
+    query = AsyncMock()
+    calendar = DateTimeCalendar(completion_template="Booked for {date:%d.%m %H:%M}")
+    slot = DateTimeCalendarCallback(act="TIME", year=2030, month=5, day=14, minute=9 * 60 + 30)
+    await calendar.process_selection(query, slot)
+    query.message.edit_text.assert_awaited_once_with("Booked for 14.05 09:30")
+    query.answer.assert_awaited_once_with()
@@ -0,0 +1,21 @@
+from aiogram_calendar import day_labels
+from aiogram_calendar.schemas import highlight, superscript
+
+
+def test_day_label():
+    assert day_labels.day_label(7) == "7"
+    assert day_labels.day_label(12, day_labels.SUPERSCRIPT) == superscript("12") == "¹²"
+    assert day_labels.day_label(12, day_labels.SUPERSCRIPT | day_labels.HIGHLIGHTED) == highlight("¹²")
+    assert day_labels.day_label(3, day_labels.SELECTED | day_labels.HIGHLIGHTED) == "[✅]"
+    assert day_labels.day_label(3, day_labels.STRIKETHROUGH) == "3̶"
+
+
+def test_labels_are_compiled_once():
+    assert day_labels.get_day_labels(day_labels.SUPERSCRIPT) is day_labels.get_day_labels(day_labels.SUPERSCRIPT)
+
+
+def test_register_day_style():
+    bold = day_labels.register_day_style(lambda text: f"*{text}*")
+    assert bold not in (day_labels.SUPERSCRIPT, day_labels.STRIKETHROUGH, day_labels.SELECTED, day_labels.HIGHLIGHTED)
+    assert day_labels.day_label(31, bold) == "*31*"
+    assert day_labels.day_label(31, bold | day_labels.HIGHLIGHTED) == "[*31*]"
@@ -73,6 +73,8 @@ testset = [
     (DialogCalendarCallback(**{'act': 'SET-YEAR', 'year': '2021', 'month': '8', 'day': '0'}), (False, None)),
     (DialogCalendarCallback(**{'act': 'START', 'year': '2021', 'month': '8', 'day': '0'}), (False, None)),
     (DialogCalendarCallback(**{'act': 'CANCEL', 'year': '2021', 'month': '8', 'day': '0'}), (False, None)),
+    (DialogCalendarCallback(**{'act': 'CENTURY', 'year': '1987', 'month': '-1', 'day': '-1'}), (False, None)),
+    (DialogCalendarCallback(**{'act': 'DECADE', 'year': '1980', 'month': '-1', 'day': '-1'}), (False, None)),
 ]
 
 
@@ -82,3 +84,64 @@ async def test_process_selection(callback_data, expected):
     query = AsyncMock()
     result = await DialogCalendar().process_selection(query=query, data=callback_data)
     assert result == expected
+
+
+async def tap(calendar, button: InlineKeyboardButton):
+    "Processes tap on button and returns keyboard message was edited with"
+    query = AsyncMock()
+    await calendar.process_selection(query, DialogCalendarCallback.unpack(button.callback_data))
+    return query.message.edit_reply_markup.await_args.kwargs["reply_markup"].inline_keyboard
+
+
+# every year of the last ten decades is reachable in four taps: century -> decade -> year -> month -> day
+@pytest.mark.asyncio
+async def test_zoom_navigation():
+    calendar = DialogCalendar()
+    kb = (await calendar.start_calendar(year=2024)).inline_keyboard
+    assert kb[1][1].text == "1930–2029"
+
+    kb = await tap(calendar, kb[1][1])
+    assert [button.text for button in kb[0]] == ["1930–39", "1940–49", "1950–59", "1960–69", "1970–79"]
+    assert kb[1][1].text == "1990–99" and kb[1][4].text.strip("[]") == "2020–29"
+    assert kb[1][0].text == "1980–89"
+
+    kb = await tap(calendar, kb[1][0])
+    assert [button.text for button in kb[1]] == ["1985", "1986", "1987", "1988", "1989"]
+    assert kb[2][1].text == "1980–1989"
+
+    kb = await tap(calendar, kb[1][2])
+    assert kb[0][1].text == "1987"
+    kb = await tap(calendar, kb[1][2])
+    assert kb[0][2].text == "Mar"
+    query = AsyncMock()
+    day = next(button for row in kb[2:] for button in row if button.text == "14")
+    selected, date = await calendar.process_selection(query, DialogCalendarCallback.unpack(day.callback_data))
+    assert selected and date == datetime(1987, 3, 14)
+
+    # zooming out of decade and paging centuries keep windows of ten decades
+    kb = await tap(calendar, (await calendar._get_decade_kb(1987)).inline_keyboard[2][1])
+    assert kb[0][0].text == "1890–99" and kb[1][4].text == "1980–89"
+    kb = await tap(calendar, kb[2][0])
+    assert kb[0][0].text == "1790–99" and kb[1][4].text == "1880–89"
+
+
+@pytest.mark.asyncio
+async def test_year_grids_are_cached():
+    first = (await DialogCalendar().start_calendar(year=1987, month=3)).inline_keyboard
+    second = (await DialogCalendar().start_calendar(year=1987, month=3)).inline_keyboard
+    assert all(a is b for row_a, row_b in zip(first, second) for a, b in zip(row_a, row_b))
+    first = (await DialogCalendar()._get_decade_kb(1987)).inline_keyboard
+    second = (await DialogCalendar()._get_decade_kb(1984)).inline_keyboard
+    assert all(a is b for a, b in zip(first[0], second[0]))
+    # layouts are cached per decade, not per year
+    first = (await DialogCalendar()._get_century_kb(1987)).inline_keyboard
+    second = (await DialogCalendar()._get_century_kb(1981)).inline_keyboard
+    assert all(a is b for row_a, row_b in zip(first, second) for a, b in zip(row_a, row_b))
+
+
+@pytest.mark.asyncio
+async def test_epoch_is_stamped_into_cached_layouts():
+    kb = (await DialogCalendar(epoch=3)._get_decade_kb(1987)).inline_keyboard
+    assert all(DialogCalendarCallback.unpack(button.callback_data).epoch == 3 for row in kb for button in row)
+    kb = (await DialogCalendar()._get_decade_kb(1987)).inline_keyboard
+    assert DialogCalendarCallback.unpack(kb[0][0].callback_data).epoch is None
@@ -0,0 +1,36 @@
+import subprocess
+import sys
+
+import pytest
+
+import aiogram_calendar
+
+
+def run(statement: str):
+    subprocess.run([sys.executable, "-c", statement], check=True)
+
+
+def test_package_import_is_lazy():
+    run(
+        "import sys, aiogram_calendar\n"
+        "assert not any(name.startswith(('aiogram.', 'pydantic')) for name in sys.modules)\n"
+        "from aiogram_calendar import DateIntervalSet\n"
+        "assert 'aiogram' not in sys.modules\n"
+        "from aiogram_calendar import SimpleCalendar\n"
+        "assert 'aiogram_calendar.dialog_calendar' not in sys.modules\n"
+    )
+
+
+def test_lazy_names():
+    assert set(aiogram_calendar.__all__) <= set(dir(aiogram_calendar))
+    for name in aiogram_calendar.__all__:
+        assert getattr(aiogram_calendar, name)
+    with pytest.raises(AttributeError):
+        aiogram_calendar.UnknownCalendar
+
+
+def test_ignore_callback_is_packed_on_first_use():
+    from aiogram_calendar.schemas import DialogCalendarCallback
+    callback = DialogCalendarCallback.unpack(aiogram_calendar.DialogCalendar.ignore_callback)
+    assert callback.act == "IGNORE"
+    assert aiogram_calendar.DialogCalendar().ignore_callback is aiogram_calendar.DialogCalendar.ignore_callback
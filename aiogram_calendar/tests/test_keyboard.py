@@ -0,0 +1,70 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from aiogram_calendar import DialogCalendar, MultipleCalendar, SimpleCalendar
+from aiogram_calendar.cache import render_cache
+from aiogram_calendar.keyboard import stamp_epoch
+from aiogram_calendar.schemas import MultipleCalendarCallback, SimpleCalAct, SimpleCalendarCallback
+
+testset = [
+    (SimpleCalendar, dict(year=2030, month=5)),
+    (DialogCalendar, dict(year=2030)),
+    (DialogCalendar, dict(year=2030, month=5)),
+    (MultipleCalendar, dict(year=2030, month=5, with_next_button=True)),
+]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("calendar_cls, kwargs", testset)
+async def test_dict_render_matches_markup(calendar_cls, kwargs):
+    calendar = calendar_cls()
+    markup = (await calendar.start_calendar(**kwargs)).model_dump(exclude_none=True)
+    rendered = await calendar.start_calendar_dict(**kwargs)
+    assert rendered["inline_keyboard"] == markup["inline_keyboard"]
+    assert json.loads(await calendar.start_calendar_json(**kwargs)) == rendered
+
+
+@pytest.mark.asyncio
+async def test_json_render_is_cached():
+    render_cache.clear()
+    first = await SimpleCalendar().start_calendar_json(year=2030, month=5)
+    assert await SimpleCalendar().start_calendar_json(year=2030, month=5) is first
+    assert await SimpleCalendar(cancel_btn="Cancel").start_calendar_json(year=2030, month=5) is not first
+    # keyboards of MultipleCalendar depend on selection and are not cached
+    calendar = MultipleCalendar()
+    first = await calendar.start_calendar_json(year=2030, month=5)
+    calendar.selected_days.append("01.05.30")
+    assert await calendar.start_calendar_json(year=2030, month=5) != first
+
+
+def test_sync_render_matches_async():
+    calendar = SimpleCalendar()
+    assert calendar.render_calendar(year=2030, month=5) == asyncio.run(calendar.start_calendar(year=2030, month=5))
+    assert calendar.render_calendar_json(year=2030, month=5) == asyncio.run(
+        calendar.start_calendar_json(year=2030, month=5)
+    )
+    dialog = DialogCalendar()
+    assert dialog.render_days(2030, 5) == asyncio.run(dialog._get_days_kb(2030, 5))
+    assert dialog.render_months(2030) == asyncio.run(dialog._get_month_kb(2030))
+
+
+# months of a year are pre-rendered on worker threads
+def test_render_in_thread_pool():
+    calendars = (SimpleCalendar(), DialogCalendar(), MultipleCalendar())
+    views = [(calendar, month) for calendar in calendars for month in range(1, 13)]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        rendered = list(executor.map(lambda view: view[0].render_calendar_json(year=2030, month=view[1]), views))
+    assert rendered == [calendar.render_calendar_json(year=2030, month=month) for calendar, month in views]
+
+
+def test_epoch_is_stamped_before_fields_of_subclasses():
+    simple = SimpleCalendarCallback(act=SimpleCalAct.day, year=2030, month=5, day=1).pack()
+    assert simple == "simple_calendar:DAY:2030:5:1::"
+    assert SimpleCalendarCallback.unpack(stamp_epoch(simple, 7)).epoch == 7
+    ranged = MultipleCalendarCallback(act=SimpleCalAct.range_end, year=2030, month=5, day=9, range_start=741000)
+    stamped = MultipleCalendarCallback.unpack(stamp_epoch(ranged.pack(), 7))
+    assert stamped.epoch == 7 and stamped.range_start == 741000
+    assert stamp_epoch(stamp_epoch(simple, 7), 8) == stamp_epoch(simple, 7)
@@ -0,0 +1,202 @@
+from datetime import date, datetime
+from unittest.mock import AsyncMock
+
+import asyncio
+
+import pytest
+
+from aiogram_calendar import MultipleCalendar
+from aiogram_calendar.common import MAX_EPOCH
+from aiogram_calendar.keyboard import stamp_epoch
+from aiogram_calendar.schemas import SELECT_DAY_FORMAT, MultipleCalendarCallback, SimpleCalAct
+from aiogram_calendar.selection import DateIntervalSet, RecurrenceRule
+from aiogram_calendar.session import SelectionSessions
+from aiogram.types import InlineKeyboardMarkup
+
+
+def test_init():
+    assert MultipleCalendar()
+
+
+@pytest.mark.asyncio
+async def test_start_calendar():
+    result = await MultipleCalendar().start_calendar()
+
+    assert isinstance(result, InlineKeyboardMarkup)
+    assert result.row_width == 7
+    # weekday buttons carry numeric day of week instead of localized label
+    weekdays_row = result.inline_keyboard[2]
+    assert [button.text for button in weekdays_row] == ['mo', 'tu', 'we', 'th', 'fr', 'sa', 'su']
+    assert MultipleCalendarCallback.unpack(weekdays_row[4].callback_data).weekday == 4
+
+
+def test_get_weekday_dates():
+    next_year = datetime.now().year + 1
+    calendar = MultipleCalendar()
+    # Fridays of March of the next year
+    dates = calendar._get_weekday_dates(next_year, 3, 4)
+    assert dates
+    for date_string in dates:
+        date = datetime.strptime(date_string, "%d.%m.%y")
+        assert date.weekday() == 4 and date.month == 3
+    assert len(dates) in (4, 5)
+    assert calendar.selected_days == dates
+
+
+def test_get_weekday_dates_skips_past():
+    now = datetime.now()
+    assert MultipleCalendar()._get_weekday_dates(now.year - 1, 1, 0) == []
+    for date_string in MultipleCalendar()._get_weekday_dates(now.year, now.month, now.weekday()):
+        assert datetime.strptime(date_string, "%d.%m.%y").date() >= now.date()
+
+
+@pytest.mark.asyncio
+async def test_process_weekdays_selection():
+    next_year = datetime.now().year + 1
+    data = MultipleCalendarCallback(act=SimpleCalAct.select_weekdays, year=next_year, month=1, weekday=6)
+    selected, result = await MultipleCalendar().process_selection(AsyncMock(), data)
+    assert selected
+    action, dates = result.split(":")
+    assert action == "add"
+    assert all(datetime.strptime(date, "%d.%m.%y").weekday() == 6 for date in dates.split(","))
+
+
+@pytest.mark.asyncio
+async def test_range_selection():
+    next_year = datetime.now().year + 1
+    calendar = MultipleCalendar(range_mode=True)
+
+    kb = (await calendar.start_calendar(year=next_year, month=1)).inline_keyboard
+    start_button = next(button for row in kb[3:] for button in row if button.text == '10')
+    start_data = MultipleCalendarCallback.unpack(start_button.callback_data)
+    assert start_data.act == SimpleCalAct.range_start
+
+    selected, result = await calendar.process_selection(AsyncMock(), start_data)
+    assert (selected, result) == (False, f"start:10.01.{next_year % 100}")
+
+    # range can be finished in another month
+    range_start = date(next_year, 1, 10)
+    kb = (await calendar.start_calendar(year=next_year, month=2, range_start=range_start)).inline_keyboard
+    end_button = next(button for row in kb[3:] for button in row if button.text == '3')
+    end_data = MultipleCalendarCallback.unpack(end_button.callback_data)
+    assert end_data.act == SimpleCalAct.range_end
+
+    selected, result = await calendar.process_selection(AsyncMock(), end_data)
+    action, ranges = result.split(":")
+    assert selected and action == "add"
+    assert list(DateIntervalSet.loads(ranges).ranges()) == [(range_start, date(next_year, 2, 3))]
+    assert date(next_year, 1, 31) in calendar.selected_ranges
+
+    kb = (await calendar.start_calendar(year=next_year, month=2, range_start=range_start)).inline_keyboard
+    assert sum(button.text == SELECT_DAY_FORMAT for row in kb[3:] for button in row) == 3
+
+    # selecting the same range again removes it
+    selected, result = await calendar.process_selection(AsyncMock(), end_data)
+    assert result == f"remove:{ranges}"
+    assert not calendar.selected_ranges
+
+
+def test_iter_selected_days():
+    calendar = MultipleCalendar(
+        selected_days=["05.01.24", "01.01.24"],
+        selected_ranges=DateIntervalSet([(date(2024, 1, 3), date(2024, 1, 5))]),
+    )
+    assert list(calendar.iter_selected_days()) == [
+        date(2024, 1, 1), date(2024, 1, 3), date(2024, 1, 4), date(2024, 1, 5)
+    ]
+    assert list(calendar.iter_selected_days(datetime(2024, 1, 2), date(2024, 1, 4))) == [
+        date(2024, 1, 3), date(2024, 1, 4)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_recurring_weekdays():
+    next_year = datetime.now().year + 1
+    calendar = MultipleCalendar(recurring_weekdays=True)
+    data = MultipleCalendarCallback(act=SimpleCalAct.select_weekdays, year=next_year, month=1, weekday=4)
+    selected, result = await calendar.process_selection(AsyncMock(), data)
+    action, rule = result.split(":")
+    assert selected and action == "rule"
+    assert RecurrenceRule.loads(rule).weekdays == {4}
+    assert not calendar.selected_days
+
+    # rule is expanded for every rendered month
+    for month in (1, 7):
+        kb = (await MultipleCalendar(recurring_weekdays=True, weekday_rule=rule).start_calendar(
+            year=next_year, month=month
+        )).inline_keyboard
+        assert MultipleCalendarCallback.unpack(kb[2][4].callback_data).act == SimpleCalAct.unselect_weekdays
+        selected_cells = [row[4] for row in kb[3:-1] if row[4].text.strip()]
+        assert selected_cells and all(button.text == SELECT_DAY_FORMAT for button in selected_cells)
+
+    data = MultipleCalendarCallback(act=SimpleCalAct.unselect_weekdays, year=next_year, month=1, weekday=4)
+    selected, result = await calendar.process_selection(AsyncMock(), data)
+    assert not RecurrenceRule.loads(result.split(":")[1]).weekdays
+
+
+@pytest.mark.asyncio
+async def test_unselect_day():
+    calendar = MultipleCalendar(selected_days=["01.05.30", "02.05.30"])
+    tap = MultipleCalendarCallback(act=SimpleCalAct.unselect_day, year=2030, month=5, day=1)
+    assert await calendar.process_selection(AsyncMock(), tap) == (True, "remove:01.05.30")
+    assert calendar.selected_days == ["02.05.30"]
+    tap = MultipleCalendarCallback(act=SimpleCalAct.day, year=2030, month=5, day=2)
+    await calendar.process_selection(AsyncMock(), tap)
+    assert calendar.selected_days == ["02.05.30"]
+
+
+@pytest.mark.asyncio
+async def test_day_out_of_range():
+    calendar = MultipleCalendar()
+    calendar.set_dates_range(datetime(2030, 1, 1), datetime(2030, 12, 31))
+    tap = MultipleCalendarCallback(act=SimpleCalAct.day, year=2031, month=5, day=1)
+    assert await calendar.process_selection(AsyncMock(), tap) == (False, None)
+    assert calendar.selected_days == []
+
+
+def slow_query():
+    "Query yielding to other handlers while answering, as real API calls do"
+    async def answer(*args, **kwargs):
+        await asyncio.sleep(0)
+
+    query = AsyncMock()
+    query.answer.side_effect = answer
+    return query
+
+
+# quick taps of one message are handled concurrently, each change is applied once and in order
+@pytest.mark.asyncio
+async def test_concurrent_taps_in_session():
+    calendar = MultipleCalendar()
+    calendar.set_dates_range(datetime(2030, 1, 1), datetime(2030, 12, 31))
+    sessions = SelectionSessions()
+    session = sessions.get((1, 100), selected_days=["01.05.30"])
+
+    taps = [MultipleCalendarCallback(act=SimpleCalAct.day, year=2030, month=5, day=day) for day in range(1, 21)]
+    taps += [MultipleCalendarCallback(act=SimpleCalAct.unselect_day, year=2030, month=5, day=day) for day in (2, 4)]
+    taps.append(MultipleCalendarCallback(act=SimpleCalAct.day, year=2031, month=5, day=1))  # out of range
+    await asyncio.gather(*(calendar.process_selection(slow_query(), tap, session) for tap in taps))
+
+    expected = [f"{day:02d}.05.30" for day in range(1, 21) if day not in (2, 4)]
+    assert sorted(session.selected_days) == expected
+    assert calendar.selected_days == []
+    deltas = session.pop_deltas()
+    assert [delta.version for delta in deltas] == list(range(1, 23))
+    assert session.snapshot()["version"] == 22 and session.pop_deltas() == []
+    # other messages have their own sessions
+    assert sessions.get((1, 101)).selected_days == [] and sessions.get((1, 100)) is session
+
+
+# callback data of Telegram is limited to 64 bytes
+@pytest.mark.asyncio
+async def test_callback_data_fits_limit_with_epoch():
+    calendar = MultipleCalendar(range_mode=True, epoch=MAX_EPOCH)
+    kb = (await calendar.start_calendar(year=2030, month=12, range_start=date(2030, 12, 1))).inline_keyboard
+    assert max(len(button.callback_data.encode()) for row in kb for button in row) <= 64
+
+
+def test_longest_callback_data_fits_limit_with_max_epoch():
+    tap = MultipleCalendarCallback(act=SimpleCalAct.unselect_weekdays, year=2030, month=12, weekday=6)
+    assert len(stamp_epoch(tap.pack(), MAX_EPOCH).encode()) <= 64
+    with pytest.raises(ValueError):
+        MultipleCalendar(epoch=MAX_EPOCH + 1)
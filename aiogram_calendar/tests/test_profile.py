@@ -0,0 +1,26 @@
+import pstats
+
+import pytest
+
+from aiogram_calendar import profile
+from aiogram_calendar.simple_calendar import SimpleCalendar
+
+
+def test_profile_report(capsys, tmp_path):
+    output = tmp_path / "stats.prof"
+    profile.main(["render", "navigation", "--repeat", "1", "--top", "3", "--output", str(output)])
+    report = capsys.readouterr().out
+    assert "workloads: render, navigation" in report
+    assert "Fake Bot API requests: editMessageReplyMarkup" in report
+    assert "SimpleCalendar.start_calendar" in report
+    assert "cProfile, top 3 by cumulative" in report
+    assert "tracemalloc, current" in report
+    assert pstats.Stats(str(output)).total_calls
+    # timed functions are restored after profiling
+    assert SimpleCalendar.start_calendar.__code__.co_name == "start_calendar"
+
+
+def test_profile_unknown_workload(capsys):
+    with pytest.raises(SystemExit):
+        profile.main(["unknown"])
+    assert "unknown workloads: unknown" in capsys.readouterr().err
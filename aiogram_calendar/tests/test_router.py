@@ -0,0 +1,146 @@
+import asyncio
+from datetime import date, datetime
+from unittest.mock import AsyncMock
+
+import pytest
+from aiogram.dispatcher.event.bases import UNHANDLED
+
+from aiogram_calendar import DateTimeCalendar, DialogCalendar, MultipleCalendar, SimpleCalendar, \
+    create_calendar_router
+from aiogram_calendar.router import CalendarDispatch
+from aiogram_calendar.session import SelectionSessions
+from aiogram_calendar.schemas import DialogCalendarCallback, MultipleCalendarCallback, SimpleCalAct, \
+    SimpleCalendarCallback
+
+
+def make_query(data: str, message_id: int = 100):
+    query = AsyncMock()
+    query.data = data
+    query.message.chat.id = 1
+    query.message.message_id = message_id
+    return query
+
+
+async def tap(router, query):
+    return await router.propagate_event("callback_query", query)
+
+
+def test_dispatch_by_prefix():
+    simple, dialog = SimpleCalendar(), DialogCalendar()
+    dispatch = CalendarDispatch()
+    dispatch.add(simple)
+    dispatch.add(dialog)
+    data = DialogCalendarCallback(act="SET-YEAR", year=2030, month=-1, day=-1).pack()
+    found = dispatch(make_query(data))
+    assert found["calendar"] is dialog and found["callback_data"].year == 2030
+    assert dispatch(make_query("other:data")) is False
+    assert dispatch(make_query("simple_calendar:broken"))["callback_data"] is None
+    with pytest.raises(ValueError):
+        dispatch.add(SimpleCalendar())
+
+
+@pytest.mark.asyncio
+async def test_router_calls_completion_hook():
+    on_simple, on_datetime = AsyncMock(), AsyncMock()
+    router = create_calendar_router((SimpleCalendar(), on_simple), (DateTimeCalendar(), on_datetime), DialogCalendar())
+
+    query = make_query(SimpleCalendarCallback(act=SimpleCalAct.next_m, year=2030, month=1, day=1).pack())
+    await tap(router, query)
+    query.message.edit_reply_markup.assert_awaited_once()
+    on_simple.assert_not_awaited()
+
+    query = make_query(SimpleCalendarCallback(act=SimpleCalAct.day, year=2030, month=1, day=5).pack())
+    await tap(router, query)
+    on_simple.assert_awaited_once_with(query, datetime(2030, 1, 5))
+    on_datetime.assert_not_awaited()
+
+    assert await tap(router, make_query("other:data")) is UNHANDLED
+
+
+def edited_keyboard(query):
+    return query.message.edit_reply_markup.await_args.kwargs["reply_markup"].inline_keyboard
+
+
+@pytest.mark.asyncio
+async def test_router_keeps_selection_per_message():
+    calendar, on_complete, sessions = MultipleCalendar(), AsyncMock(), SelectionSessions()
+    router = create_calendar_router((calendar, on_complete), sessions=sessions)
+    data = MultipleCalendarCallback(act=SimpleCalAct.day, year=2030, month=5, day=1).pack()
+
+    first, second = make_query(data, message_id=100), make_query(data, message_id=101)
+    await tap(router, first)
+    await tap(router, second)
+    # shared calendar is not changed, every message selected the day in its own session
+    assert calendar.selected_days == []
+    for query in (first, second):
+        query.answer.assert_awaited_once_with()
+        assert edited_keyboard(query)[3][2].text != "1"  # day is rendered as selected
+    on_complete.assert_not_awaited()
+
+    save = make_query(MultipleCalendarCallback(act=SimpleCalAct.save_days).pack(), message_id=100)
+    await tap(router, save)
+    save.message.delete_reply_markup.assert_awaited_once()
+    assert on_complete.await_args.args[1]["selected_days"] == ["01.05.30"]
+    assert len(sessions) == 1
+
+    cancel = make_query(MultipleCalendarCallback(act=SimpleCalAct.cancel).pack(), message_id=101)
+    await tap(router, cancel)
+    cancel.message.delete_reply_markup.assert_awaited_once()
+    assert on_complete.await_count == 1 and len(sessions) == 0
+
+
+@pytest.mark.asyncio
+async def test_router_saves_after_taps_in_progress():
+    on_complete, sessions = AsyncMock(), SelectionSessions()
+    router = create_calendar_router((MultipleCalendar(), on_complete), sessions=sessions)
+    session = sessions.get((1, 100))
+
+    # tap of the same message is being processed while save is tapped
+    async with session.lock:
+        save = asyncio.create_task(
+            tap(router, make_query(MultipleCalendarCallback(act=SimpleCalAct.save_days).pack()))
+        )
+        for _ in range(20):
+            await asyncio.sleep(0)
+        session.selected_days.append("01.05.30")
+        assert not save.done()
+    await save
+    assert on_complete.await_args.args[1]["selected_days"] == ["01.05.30"]
+
+
+@pytest.mark.asyncio
+async def test_router_picks_ranges_per_message():
+    calendar, sessions = MultipleCalendar(range_mode=True), SelectionSessions()
+    router = create_calendar_router(calendar, sessions=sessions)
+    start = MultipleCalendarCallback(act=SimpleCalAct.range_start, year=2030, month=5, day=1).pack()
+    next_month = MultipleCalendarCallback(act=SimpleCalAct.next_m, year=2030, month=5, day=1).pack()
+    end = MultipleCalendarCallback(
+        act=SimpleCalAct.range_end, year=2030, month=6, day=10, range_start=date(2030, 5, 1).toordinal()
+    ).pack()
+
+    for message_id in (100, 101):
+        await tap(router, make_query(start, message_id))
+        query = make_query(next_month, message_id)
+        await tap(router, query)
+        kb = edited_keyboard(query)
+        assert kb[1][1].text == "Jun"
+        # range started in May is continued in June
+        day = MultipleCalendarCallback.unpack(kb[4][0].callback_data)
+        assert day.act == SimpleCalAct.range_end and day.range_start == date(2030, 5, 1).toordinal()
+        await tap(router, make_query(end, message_id))
+        [delta] = sessions.get((1, message_id)).pop_deltas()
+        assert delta.change.startswith("add:")
+        assert sessions.get((1, message_id)).range_start is None
+
+    assert not calendar.selected_ranges
+
+
+@pytest.mark.asyncio
+async def test_router_answers_keyboards_of_older_releases_as_stale():
+    on_simple = AsyncMock()
+    router = create_calendar_router((SimpleCalendar(stale_notice="Outdated"), on_simple))
+    # callback data packed before epoch was added
+    query = make_query("simple_calendar:DAY:2030:5:1:")
+    await tap(router, query)
+    query.answer.assert_awaited_once_with("Outdated", cache_time=3600)
+    on_simple.assert_not_awaited()
@@ -0,0 +1,97 @@
+from datetime import date, datetime, timedelta
+from itertools import islice
+
+import pytest
+
+from aiogram_calendar.selection import DateIntervalSet, RecurrenceRule, iter_weekday_dates, merge_dates
+
+
+def test_add_merges_adjacent_and_overlapping():
+    intervals = DateIntervalSet()
+    intervals.add(date(2024, 1, 10), date(2024, 1, 24))
+    intervals.add(date(2024, 1, 25))
+    intervals.add(date(2024, 2, 1), date(2024, 1, 28))
+    assert list(intervals.ranges()) == [(date(2024, 1, 10), date(2024, 1, 25)), (date(2024, 1, 28), date(2024, 2, 1))]
+    intervals.add(date(2024, 1, 20), date(2024, 1, 27))
+    assert list(intervals.ranges()) == [(date(2024, 1, 10), date(2024, 2, 1))]
+
+
+def test_remove_splits_ranges():
+    intervals = DateIntervalSet([(date(2024, 1, 1), date(2024, 3, 31))])
+    intervals.remove(date(2024, 2, 1), date(2024, 2, 29))
+    assert list(intervals.ranges()) == [(date(2024, 1, 1), date(2024, 1, 31)), (date(2024, 3, 1), date(2024, 3, 31))]
+    intervals.remove(date(2023, 12, 1), date(2024, 1, 31))
+    assert list(intervals.ranges()) == [(date(2024, 3, 1), date(2024, 3, 31))]
+
+
+def test_contains():
+    intervals = DateIntervalSet([(date(2024, 1, 10), date(2024, 1, 24)), (date(2024, 5, 1), date(2024, 5, 1))])
+    assert date(2024, 1, 10) in intervals
+    assert datetime(2024, 1, 24) in intervals
+    assert date(2024, 1, 25) not in intervals
+    assert date(2024, 5, 1) in intervals
+    assert date(2023, 5, 1) not in intervals
+    assert intervals.contains_range(date(2024, 1, 12), date(2024, 1, 20))
+    assert not intervals.contains_range(date(2024, 1, 12), date(2024, 5, 1))
+
+
+def test_dumps_loads():
+    intervals = DateIntervalSet([(date(2024, 1, 10), date(2024, 1, 24)), (date(2024, 5, 1), date(2024, 5, 1))])
+    dumped = intervals.dumps()
+    assert ":" not in dumped
+    assert len(dumped) < 20
+    assert DateIntervalSet.loads(dumped) == intervals
+    assert not DateIntervalSet.loads("")
+
+
+def test_iter_weekday_dates():
+    # every Tue/Thu from Monday 1st of January till 12th of January
+    dates = iter_weekday_dates({1, 3}, date(2024, 1, 1), until=date(2024, 1, 12))
+    assert list(dates) == [date(2024, 1, 2), date(2024, 1, 4), date(2024, 1, 9), date(2024, 1, 11)]
+    # endless without until
+    dates = iter_weekday_dates([0], date(2024, 1, 1))
+    assert list(islice(dates, 1000))[-1] == date(2024, 1, 1) + timedelta(weeks=999)
+    assert list(iter_weekday_dates([], date(2024, 1, 1))) == []
+
+
+def test_iter_dates():
+    intervals = DateIntervalSet([(date(2024, 1, 30), date(2024, 2, 2)), (date(2024, 3, 1), date(2024, 3, 2))])
+    assert list(intervals.iter_dates()) == [
+        date(2024, 1, 30), date(2024, 1, 31), date(2024, 2, 1), date(2024, 2, 2), date(2024, 3, 1), date(2024, 3, 2)
+    ]
+    assert list(intervals.iter_dates(date(2024, 2, 2), date(2024, 3, 1))) == [date(2024, 2, 2), date(2024, 3, 1)]
+    assert list(intervals.iter_dates(until=date(2024, 1, 1))) == []
+
+
+def test_merge_dates():
+    merged = merge_dates([date(2024, 1, 1), date(2024, 1, 3)], [date(2024, 1, 2), date(2024, 1, 3)])
+    assert list(merged) == [date(2024, 1, 1), date(2024, 1, 2), date(2024, 1, 3)]
+
+
+# every second week on Tue/Thu since Wednesday 3rd of January 2024
+rule = RecurrenceRule({1, 3}, start=date(2024, 1, 3), interval=2)
+testset = [
+    (rule, [date(2024, 1, 4), date(2024, 1, 16), date(2024, 1, 18), date(2024, 1, 30), date(2024, 2, 1)]),
+    (rule.replace(count=3), [date(2024, 1, 4), date(2024, 1, 16), date(2024, 1, 18)]),
+    (rule.replace(until=date(2024, 1, 17)), [date(2024, 1, 4), date(2024, 1, 16)]),
+    (rule.replace(weekdays=()), []),
+]
+
+
+@pytest.mark.parametrize("rule, expected", testset)
+def test_recurrence_rule(rule, expected):
+    assert list(islice(rule.iter_dates(), 5)) == expected
+    for day in expected:
+        assert day in rule
+    assert date(2024, 1, 2) not in rule
+    assert date(2024, 1, 9) not in rule
+    assert RecurrenceRule.loads(rule.dumps()) == rule
+
+
+def test_recurrence_rule_iter_from_date():
+    rule = RecurrenceRule({0, 4}, start=date(2024, 1, 1), interval=3, count=10)
+    occurrences = list(rule.iter_dates())
+    assert len(occurrences) == 10
+    for i, day in enumerate(occurrences):
+        assert list(rule.iter_dates(start=day)) == occurrences[i:]
+    assert rule.month_days(2024, 2) == frozenset(day.day for day in occurrences if day.month == 2)
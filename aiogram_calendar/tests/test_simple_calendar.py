@@ -5,7 +5,8 @@ from unittest.mock import AsyncMock
 import pytest
 
 from aiogram_calendar import SimpleCalendar
-from aiogram_calendar.schemas import SimpleCalendarCallback
+from aiogram_calendar.common import get_first_weekday
+from aiogram_calendar.schemas import SimpleCalAct, SimpleCalendarCallback
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
 
@@ -94,3 +95,108 @@ async def test_process_selection(callback_data, expected):
     query = AsyncMock()
     result = await SimpleCalendar().process_selection(query=query, data=callback_data)
     assert result == expected
+
+
+@pytest.mark.asyncio
+async def test_start_calendar_firstweekday():
+    result = await SimpleCalendar(firstweekday=6).start_calendar(year=2023, month=10)
+    assert [button.text for button in result.inline_keyboard[2]] == ['su', 'mo', 'tu', 'we', 'th', 'fr', 'sa']
+    # 1st of October 2023 is Sunday, so it opens the first week when week starts on Sunday
+    assert result.inline_keyboard[3][0].text == '1'
+
+
+@pytest.mark.parametrize("loc, expected", [
+    (None, calendar.MONDAY),
+    ('uk_UA', calendar.MONDAY),
+    ('en_US', calendar.SUNDAY),
+    ('ar_EG.UTF-8', calendar.SATURDAY),
+])
+def test_get_first_weekday(loc, expected):
+    assert get_first_weekday(loc) == expected
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("months_shown, expected_months", [(1, ['May']), (2, ['May', 'Jun']), (5, ['May', 'Jun'])])
+async def test_start_calendar_months_shown(months_shown, expected_months):
+    result = await SimpleCalendar(months_shown=months_shown).start_calendar(year=2030, month=5)
+    kb = result.inline_keyboard
+    assert sum(len(row) for row in kb) <= 100
+    captions = [kb[0][1].text] + [row[0].text for row in kb[3:-1] if len(row) == 1]
+    assert captions == expected_months
+    days = [button.text for row in kb[3:-1] if len(row) == 7 for button in row if button.text.strip()]
+    assert days == [str(day) for month in expected_months for day in range(1, 31 + (month == 'May'))]
+
+
+@pytest.mark.asyncio
+async def test_process_selection_months_shown():
+    query = AsyncMock()
+    callback_data = SimpleCalendarCallback(act='NEXT-MONTH', year=2030, month=12, day=1)
+    await SimpleCalendar(months_shown=2).process_selection(query=query, data=callback_data)
+    kb = query.message.edit_reply_markup.call_args.kwargs['reply_markup'].inline_keyboard
+    assert (kb[0][0].text, kb[0][1].text) == ('2031', 'Feb')
+
+
+# months not fitting into keyboard are shown by the next page, not skipped
+@pytest.mark.asyncio
+async def test_navigation_moves_by_months_shown():
+    calendar = SimpleCalendar(months_shown=3)
+
+    async def navigate(act, year, month):
+        query = AsyncMock()
+        await calendar.process_selection(query, SimpleCalendarCallback(act=act, year=year, month=month, day=1))
+        kb = query.message.edit_reply_markup.call_args.kwargs['reply_markup'].inline_keyboard
+        return kb[0][0].text, kb[0][1].text
+
+    # May and Jun 2030 are shown, Jul does not fit
+    assert calendar._get_shown_months(2030, 5) == [(2030, 5), (2030, 6)]
+    assert await navigate('NEXT-MONTH', 2030, 5) == ('2030', 'Jul')
+    assert await navigate('PREV-MONTH', 2030, 7) == ('2030', 'May')
+    assert await navigate('PREV-MONTH', 2030, 5) == ('2030', 'Mar')
+
+
+@pytest.mark.asyncio
+async def test_epoch_is_stamped():
+    kb = (await SimpleCalendar(epoch=7).start_calendar(year=2030, month=5)).inline_keyboard
+    callbacks = [button.callback_data for row in kb for button in row]
+    assert all(SimpleCalendarCallback.unpack(callback).epoch == 7 for callback in callbacks)
+    # keyboards of calendars without epoch are not changed
+    kb = (await SimpleCalendar().start_calendar(year=2030, month=5)).inline_keyboard
+    assert SimpleCalendarCallback.unpack(kb[1][1].callback_data).epoch is None
+
+
+@pytest.mark.asyncio
+async def test_stale_tap_is_answered_with_notice():
+    query = AsyncMock()
+    tap = SimpleCalendarCallback(act=SimpleCalAct.prev_m, year=2025, month=5, day=1, epoch=6)
+    assert await SimpleCalendar(epoch=7, stale_notice="Outdated").process_selection(query, tap) == (False, None)
+    query.answer.assert_awaited_once_with("Outdated", cache_time=3600)
+    query.message.edit_reply_markup.assert_not_awaited()
+
+    # fresh taps are processed
+    query = AsyncMock()
+    tap = SimpleCalendarCallback(act=SimpleCalAct.next_m, year=2030, month=5, day=1, epoch=7)
+    await SimpleCalendar(epoch=7).process_selection(query, tap)
+    query.answer.assert_not_awaited()
+    query.message.edit_reply_markup.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_stale_tap_rerenders_current_view():
+    query = AsyncMock()
+    calendar = SimpleCalendar(epoch=7, stale_rerender=True)
+    tap = SimpleCalendarCallback(act=SimpleCalAct.day, year=2025, month=5, day=1)
+    assert await calendar.process_selection(query, tap) == (False, None)
+    markup = query.message.edit_reply_markup.call_args.kwargs["reply_markup"]
+    assert markup == await calendar.start_calendar()
+    assert SimpleCalendarCallback.unpack(markup.inline_keyboard[1][1].callback_data).epoch == 7
+
+
+@pytest.mark.asyncio
+async def test_completion_mode():
+    query = AsyncMock()
+    calendar = SimpleCalendar(completion_template="You selected {date:%d/%m/%Y}")
+    tap = SimpleCalendarCallback(act=SimpleCalAct.day, year=2030, month=5, day=14)
+    assert await calendar.process_selection(query, tap) == (True, datetime(2030, 5, 14))
+    query.message.edit_text.assert_awaited_once_with("You selected 14/05/2030")
+    query.answer.assert_awaited_once_with()
+    query.message.delete_reply_markup.assert_not_awaited()
@@ -0,0 +1,39 @@
+"""Measures cold import time of package and its calendars, every statement runs in a fresh interpreter
+
+Run from repository root: python -m benchmarks.bench_import
+When a number grows, python -X importtime -c "<statement>" shows which module is slow.
+"""
+import statistics
+import subprocess
+import sys
+import time
+
+RUNS = 7
+
+STATEMENTS = (
+    "import aiogram_calendar",
+    "from aiogram_calendar import DateIntervalSet",
+    "from aiogram_calendar import SimpleCalendar",
+    "from aiogram_calendar import SimpleCalendar; SimpleCalendar.ignore_callback",
+    "from aiogram_calendar import SimpleCalendar, DialogCalendar, MultipleCalendar, DateTimeCalendar",
+)
+
+
+def measure(statement: str) -> float:
+    "Returns median wall time of interpreter running statement in seconds"
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", statement], check=True)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    baseline = measure("pass")
+    for statement in STATEMENTS:
+        print(f"{statement:<100} {(measure(statement) - baseline) * 1e3:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Compares rendering of calendars to aiogram models and JSON with rendering to plain dicts and cached JSON
+
+Run from repository root: python -m benchmarks.bench_render
+"""
+import asyncio
+import json
+import timeit
+
+from aiogram_calendar import DialogCalendar, MultipleCalendar, SimpleCalendar
+
+NUMBER = 300
+
+
+def bench(name: str, coroutine_factory):
+    loop = asyncio.new_event_loop()
+    seconds = timeit.timeit(lambda: loop.run_until_complete(coroutine_factory()), number=NUMBER)
+    loop.close()
+    print(f"{name:<45} {seconds / NUMBER * 1e6:10.1f} us")
+
+
+async def model_json(calendar, **kwargs):
+    markup = await calendar.start_calendar(**kwargs)
+    return markup.model_dump_json(exclude_none=True)
+
+
+async def dict_json(calendar, **kwargs):
+    return json.dumps(await calendar.start_calendar_dict(**kwargs), ensure_ascii=False)
+
+
+def main():
+    for calendar, kwargs in (
+        (SimpleCalendar(), dict(year=2030, month=5)),
+        (DialogCalendar(), dict(year=2030, month=5)),
+        (MultipleCalendar(), dict(year=2030, month=5)),
+    ):
+        name = type(calendar).__name__
+        bench(f"{name} models + model_dump_json", lambda: model_json(calendar, **kwargs))
+        bench(f"{name} dicts + json.dumps", lambda: dict_json(calendar, **kwargs))
+        bench(f"{name} start_calendar_json", lambda: calendar.start_calendar_json(**kwargs))
+
+
+if __name__ == "__main__":
+    main()